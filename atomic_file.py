@@ -0,0 +1,12 @@
+import os
+
+# Shared by utils and metrics (which the scrape worker imports), so it mustn't import discord
+
+def write_atomic(path, raw):
+    """Write bytes to path via a temp file + os.replace, so readers never see a partial file."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
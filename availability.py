@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+
+def window_mask(from_minutes, to_minutes):
+    """Bitmask of the 15-minute slots touched by [from_minutes, to_minutes)."""
+    first = max(0, from_minutes // SLOT_MINUTES)
+    last = min(SLOTS_PER_DAY, -(-to_minutes // SLOT_MINUTES))
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+def mask_to_ranges(mask):
+    """[(start_minutes, end_minutes)] runs of set bits, in day order."""
+    ranges = []
+    slot = 0
+    while mask:
+        if mask & 1:
+            run = slot
+            while mask & 1:
+                mask >>= 1
+                slot += 1
+            ranges.append((run * SLOT_MINUTES, slot * SLOT_MINUTES))
+        else:
+            mask >>= 1
+            slot += 1
+    return ranges
+
+class Availability:
+    """Busy time per person per day as 96-bit slot masks (one bit per 15 minutes).
+
+    Overnight shifts mark the rest of their own day and the start of the
+    next. "Who is free in this window" and "when are these people all free"
+    become AND/OR over a handful of integers.
+    """
+
+    def __init__(self, shifts):
+        busy = {}
+        for s in shifts:
+            if s["start"] is None or s["end"] is None:
+                continue
+            days = busy.setdefault(s["name"].lower(), {})
+            if s["overnight"]:
+                days[s["date"]] = days.get(s["date"], 0) | window_mask(s["start"], 24 * 60)
+                next_day = s["date"] + timedelta(days=1)
+                days[next_day] = days.get(next_day, 0) | window_mask(0, s["end"])
+            else:
+                days[s["date"]] = days.get(s["date"], 0) | window_mask(s["start"], s["end"])
+        self.busy = busy
+
+    def busy_mask(self, name, day):
+        return self.busy.get(name.lower(), {}).get(day, 0)
+
+    def is_free(self, name, day, mask=FULL_DAY):
+        return not (self.busy_mask(name, day) & mask)
+
+    def free_in_window(self, names, day, mask):
+        return [n for n in names if self.is_free(n, day, mask)]
+
+    def common_free(self, names, day, mask=FULL_DAY):
+        """Slots within mask where every one of names is free."""
+        taken = 0
+        for n in names:
+            taken |= self.busy_mask(n, day)
+        return mask & ~taken
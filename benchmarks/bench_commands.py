@@ -0,0 +1,97 @@
+"""Latency percentiles for the command and autocomplete hot paths on synthetic rotas.
+
+Run from the repo root:  python -m benchmarks.bench_commands [--iterations N]
+Each command runs through its registered callback with a FakeInteraction, both
+cold (query cache cleared every call) and warm.
+"""
+import argparse
+import asyncio
+import time
+from datetime import date
+
+import discord
+from discord.ext import commands
+
+import utils
+from utils import store, normalize_shift, name_autocomplete, day_autocomplete, role_autocomplete
+from query_cache import query_cache
+from commands_rota import register_rota_commands
+from commands_free import register_free_command
+from commands_swap import register_swap_command
+from benchmarks.fake_discord import FakeInteraction
+from benchmarks.synthetic_rota import generate_rota
+
+SIZES = [(50, 1), (200, 4), (1000, 12), (2000, 26)]
+
+def load_synthetic(staff, weeks, seed=0):
+    shifts = [normalize_shift(s) for s in generate_rota(staff, weeks, date.today(), seed)]
+    # Point the store at a file that doesn't exist so refresh() never replaces the data
+    store.path = utils.CACHE_FILE = "bench_does_not_exist.json"
+    store.publish(shifts)
+    return shifts
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+async def measure(call, iterations, cold):
+    samples = []
+    for _ in range(iterations):
+        if cold:
+            query_cache.clear()
+        started = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+def build_cases(bot, shifts):
+    tree = bot.tree
+    rota = tree.get_command("rota").callback
+    free = tree.get_command("free").callback
+    swap = tree.get_command("swap").callback
+    someone = shifts[len(shifts) // 2]
+    first = store.names[0]
+    day_label = utils.date_to_pretty(someone["date"])
+
+    def command(callback, **kwargs):
+        return lambda: callback(FakeInteraction(), **kwargs)
+
+    return [
+        ("/rota today", command(rota)),
+        ("/rota name", command(rota, name=first)),
+        ("/rota role", command(rota, role="FAB Serving")),
+        ("/free day", command(free, days=someone["date"].strftime("%A"))),
+        ("/free names+window", command(free, names=f"{first}, {someone['name']}", from_time="14:00", to_time="18:00")),
+        ("/swap shift", command(swap, name=someone["name"], day=day_label, role=someone["role"])),
+        ("/swap day matrix", command(swap, day=day_label, scope="day")),
+        ("autocomplete name", lambda: name_autocomplete(FakeInteraction(), first[:3])),
+        ("autocomplete role", lambda: role_autocomplete(FakeInteraction(), "fab")),
+        ("autocomplete day", lambda: day_autocomplete(FakeInteraction(), "jun")),
+    ]
+
+async def main(iterations, sizes):
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
+    register_rota_commands(bot)
+    register_free_command(bot)
+    register_swap_command(bot)
+    print(f"{'case':<22}{'staff':>7}{'weeks':>6}{'shifts':>8}  {'mode':<5}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for staff, weeks in sizes:
+        shifts = load_synthetic(staff, weeks)
+        for label, call in build_cases(bot, shifts):
+            for cold in (True, False):
+                samples = await measure(call, iterations, cold)
+                print(
+                    f"{label:<22}{staff:>7}{weeks:>6}{len(shifts):>8}  {'cold' if cold else 'warm':<5}"
+                    f"{percentile(samples, 50):>9.2f}{percentile(samples, 95):>9.2f}"
+                    f"{percentile(samples, 99):>9.2f}{max(samples):>9.2f}"
+                )
+    print(f"Query cache: {query_cache.stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--sizes", default=",".join(f"{s}x{w}" for s, w in SIZES),
+                        help="comma-separated STAFFxWEEKS, e.g. 50x1,2000x26")
+    args = parser.parse_args()
+    sizes = [tuple(int(x) for x in size.split("x")) for size in args.sizes.split(",")]
+    asyncio.run(main(args.iterations, sizes))
@@ -0,0 +1,128 @@
+"""End-to-end scraper throughput against the local Quinyx stand-in.
+
+Run from the repo root:  python -m benchmarks.bench_scraper [--staff 200 --weeks 2]
+Starts benchmarks/quinyx_standin.py on a free port, points the scraper at it
+and scrapes the whole generated window in each mode: "cold" logs in and sets
+the colleague filter on a fresh profile, "warm" reuses the saved session.
+Reports wall time, browser round-trips (awaited Playwright calls), HTTP
+requests served and records per second, and fails if the scraped shifts
+differ from the generated ones.
+"""
+import argparse
+import asyncio
+import contextlib
+import inspect
+import io
+import os
+import tempfile
+import time
+from collections import Counter
+from datetime import date
+
+from playwright.async_api import JSHandle
+
+import quinyx_scraper
+from quinyx_scraper import QuinyxSession, fetch_user_shifts, wait_timing_summary
+from benchmarks.quinyx_standin import QuinyxStandin
+from benchmarks.synthetic_rota import generate_rota
+
+def counted(value, counter):
+    if isinstance(value, JSHandle):
+        return CountingProxy(value, counter)
+    if isinstance(value, list):
+        return [counted(v, counter) for v in value]
+    return value
+
+class CountingProxy:
+    """Wraps a Page or handle, counting every awaited call as one browser round-trip."""
+
+    def __init__(self, target, counter):
+        self._target = target
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return self._await(name, result) if inspect.isawaitable(result) else result
+        return call
+
+    async def _await(self, name, awaitable):
+        self._counter[name] += 1
+        return counted(await awaitable, self._counter)
+
+class CountingSession(QuinyxSession):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.round_trips = Counter()
+
+    async def new_page(self):
+        return CountingProxy(await super().new_page(), self.round_trips)
+
+def shift_tuple(shift):
+    return (shift["name"], shift["date"], shift["start"], shift["end"], shift["role"])
+
+def check_exact(scraped, expected):
+    got, want = Counter(map(shift_tuple, scraped)), Counter(map(shift_tuple, expected))
+    if got != want:
+        missing, extra = want - got, got - want
+        raise AssertionError(
+            f"scrape mismatch: {sum(missing.values())} missing, {sum(extra.values())} unexpected; "
+            f"e.g. missing {list(missing)[:3]}, unexpected {list(extra)[:3]}"
+        )
+
+async def run_once(session, label, mode, from_date, to_date, expected, standin, verbose):
+    quinyx_scraper.SCRAPE_MODE = mode
+    session.round_trips.clear()
+    standin.requests.clear()
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    started = time.perf_counter()
+    with output:
+        scraped = await fetch_user_shifts(None, from_date, to_date)
+    elapsed = time.perf_counter() - started
+    check_exact(scraped, expected)
+    print(
+        f"{mode:<8}{label:<6}{len(scraped):>8}{elapsed:>9.2f}s{sum(session.round_trips.values()):>12}"
+        f"{sum(standin.requests.values()):>10}{len(scraped) / elapsed:>11.0f}"
+    )
+    if verbose:
+        print(f"  round-trips: {dict(session.round_trips)}")
+        print("  " + wait_timing_summary().replace("\n", "\n  "))
+
+async def main(args):
+    from_date = date.today()
+    expected = generate_rota(args.staff, args.weeks, from_date, seed=args.seed)
+    to_date = max(date.fromisoformat(s["date"]) for s in expected)
+    standin = QuinyxStandin(expected, render_latency_ms=args.render_latency, api_latency_ms=args.api_latency)
+    quinyx_scraper.BASE_URL = await standin.start()
+    quinyx_scraper.EMAIL, quinyx_scraper.PASSWORD = "bench@example.com", "bench"
+    print(f"{len(expected)} shifts, {args.staff} staff x {args.weeks} weeks, served at {quinyx_scraper.BASE_URL}")
+    print(f"{'mode':<8}{'run':<6}{'shifts':>8}{'wall':>10}{'round-trips':>12}{'requests':>10}{'records/s':>11}")
+    try:
+        for mode in ("network", "dom"):
+            with tempfile.TemporaryDirectory() as profile:
+                session = CountingSession(
+                    state_file=os.path.join(profile, "state.json"),
+                    prefs_file=os.path.join(profile, "prefs.json"),
+                    keep_warm=False,
+                )
+                quinyx_scraper.session = session
+                await run_once(session, "cold", mode, from_date, to_date, expected, standin, args.verbose)
+                for _ in range(args.repeat):
+                    await run_once(session, "warm", mode, from_date, to_date, expected, standin, args.verbose)
+    finally:
+        await standin.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--staff", type=int, default=200)
+    parser.add_argument("--weeks", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="warm runs per mode")
+    parser.add_argument("--render-latency", type=int, default=30)
+    parser.add_argument("--api-latency", type=int, default=100)
+    parser.add_argument("--verbose", action="store_true", help="show scraper output and per-call round-trips")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,43 @@
+"""Offline stand-in for discord.Interaction that records what a command sends."""
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+
+class FakeResponse:
+    def __init__(self, log):
+        self.log = log
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def send_message(self, content=None, **kwargs):
+        self._done = True
+        self.log.append(("send_message", content, kwargs))
+
+    async def defer(self, **kwargs):
+        self._done = True
+        self.log.append(("defer", None, kwargs))
+
+    async def edit_message(self, content=None, **kwargs):
+        self._done = True
+        self.log.append(("edit_message", content, kwargs))
+
+class FakeFollowup:
+    def __init__(self, log):
+        self.log = log
+
+    async def send(self, content=None, **kwargs):
+        self.log.append(("followup", content, kwargs))
+
+class FakeInteraction:
+    def __init__(self, user_id=1):
+        self.sent = []
+        self.user = FakeUser(user_id)
+        self.extras = {}
+        self.response = FakeResponse(self.sent)
+        self.followup = FakeFollowup(self.sent)
+
+    async def delete_original_response(self):
+        self.sent.append(("delete_original_response", None, {}))
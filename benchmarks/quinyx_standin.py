@@ -0,0 +1,290 @@
+"""Local stand-in for the parts of web.quinyx.com the scraper touches.
+
+Serves the login form, the staff-portal schedule with its filter panel and a
+virtualized, lazily rendered schedule list, using the same selectors and
+data-test-ids as the real site. Shifts come from a list of raw shift dicts
+(see synthetic_rota.generate_rota) and are also served as a JSON schedule API
+so both scrape modes have something to read.
+
+Run standalone:  python -m benchmarks.quinyx_standin --staff 200 --weeks 2
+then point the scraper at it with QUINYX_BASE_URL=http://127.0.0.1:8765
+"""
+import argparse
+import asyncio
+import secrets
+from collections import Counter
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+from benchmarks.synthetic_rota import generate_rota
+
+SESSION_COOKIE = "qsession"
+
+LOGIN_HTML = """<!doctype html>
+<html><head><title>Quinyx stand-in - Log in</title></head>
+<body>
+<form id="login" onsubmit="return false">
+  <input name="email" type="email">
+  <button type="button" data-test-id="fetchLoginProvidersButton" id="providers">Continue</button>
+  <div id="password-step" hidden>
+    <input name="password" type="password" disabled>
+    <button type="button" data-test-id="logInButton" id="log-in">Log in</button>
+  </div>
+</form>
+<script>
+document.getElementById('providers').addEventListener('click', () => {
+  const step = document.getElementById('password-step');
+  step.hidden = false;
+  step.querySelector('input').disabled = false;
+});
+document.getElementById('log-in').addEventListener('click', async () => {
+  const body = JSON.stringify({
+    email: document.querySelector('input[name="email"]').value,
+    password: document.querySelector('input[name="password"]').value,
+  });
+  const response = await fetch('/login', {method: 'POST', body, headers: {'content-type': 'application/json'}});
+  if (response.ok) location.href = '/staffPortal';
+});
+</script>
+</body></html>
+"""
+
+HOME_HTML = """<!doctype html>
+<html><head><title>Quinyx stand-in</title></head>
+<body><div class="legacyDiv">Staff portal</div></body></html>
+"""
+
+SCHEDULE_HTML = """<!doctype html>
+<html><head><title>Quinyx stand-in - Schedule</title>
+<style>
+  body { margin: 0; font-family: sans-serif; }
+  .staff-portal-schedule__row, .date-header { height: __ITEM_HEIGHT__px; box-sizing: border-box; overflow: hidden; }
+  .styled-checkbox__icon { display: inline-block; width: 14px; height: 14px; border: 1px solid #888; }
+</style></head>
+<body>
+<div class="legacyDiv bold hidden-sm" id="filter-button">Filter</div>
+<div data-test-id="detail-panel" style="display: none">
+  <div class="padding-2-left">
+    <label><input type="checkbox" id="own-shifts" checked><span class="styled-checkbox__icon"></span> My shifts</label>
+    <label><input type="checkbox" id="colleague-shifts"><span class="styled-checkbox__icon"></span> Colleague's shift</label>
+  </div>
+  <button type="button" data-test-id="primaryActionButton" id="apply-filter">Apply</button>
+</div>
+<div id="schedule-scroll" style="overflow: auto; height: __VIEWPORT_HEIGHT__px;">
+  <div id="schedule-spacer" style="position: relative;">
+    <div id="schedule-list"></div>
+  </div>
+</div>
+<script>
+const ITEM_HEIGHT = __ITEM_HEIGHT__;
+const OVERSCAN = 2;
+const RENDER_LATENCY_MS = __RENDER_LATENCY_MS__;
+const DAYS = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat'];
+const params = new URLSearchParams(location.search);
+const container = document.getElementById('schedule-scroll');
+const spacer = document.getElementById('schedule-spacer');
+const list = document.getElementById('schedule-list');
+const panel = document.querySelector('div[data-test-id="detail-panel"]');
+let items = [];
+
+const pad = n => String(n).padStart(2, '0');
+const hhmm = iso => iso.slice(11, 16);
+const header = iso => {
+  const d = new Date(iso.slice(0, 10) + 'T12:00:00');
+  return `${DAYS[d.getDay()]}, ${pad(d.getDate())}/${pad(d.getMonth() + 1)}/${d.getFullYear()}`;
+};
+
+function build(item) {
+  const block = document.createElement('div');
+  if (item.header) {
+    block.className = 'legacyDiv date-header';
+    const span = document.createElement('span');
+    span.className = 'text-uppercase padding-1 padding-2-left padding-2-right bold background-transparent-grey font-small';
+    span.textContent = item.header;
+    block.append(span);
+    return block;
+  }
+  block.className = 'legacyDiv background-white padding-2 staff-portal-schedule__row';
+  const name = document.createElement('div');
+  name.className = 'flex-row overflow-ellipsis d-block max-width-100 padding-1-right';
+  name.textContent = item.employeeName;
+  const time = document.createElement('span');
+  time.className = 'bold display-inline-block';
+  time.textContent = `${hhmm(item.begin)} - ${hhmm(item.end)}`;
+  const role = document.createElement('span');
+  role.className = 'display-inline-block padding-1-left max-width-50 overflow-ellipsis';
+  role.textContent = item.shiftTypeName;
+  block.append(name, time, role);
+  return block;
+}
+
+function render() {
+  const first = Math.max(0, Math.floor(container.scrollTop / ITEM_HEIGHT) - OVERSCAN);
+  const last = Math.min(items.length, Math.ceil((container.scrollTop + container.clientHeight) / ITEM_HEIGHT) + OVERSCAN);
+  spacer.style.height = `${items.length * ITEM_HEIGHT}px`;
+  list.style.transform = `translateY(${first * ITEM_HEIGHT}px)`;
+  list.replaceChildren(...items.slice(first, last).map(build));
+}
+
+async function load() {
+  const colleagues = localStorage.getItem('colleagueFilter') === '1' ? 1 : 0;
+  const query = new URLSearchParams({fromDate: params.get('fromDate'), toDate: params.get('toDate'), colleagues});
+  const response = await fetch(`/api/schedule/shifts?${query}`);
+  const payload = await response.json();
+  items = [];
+  let day = null;
+  for (const shift of payload.shifts) {
+    if (shift.begin.slice(0, 10) !== day) {
+      day = shift.begin.slice(0, 10);
+      items.push({header: header(shift.begin)});
+    }
+    items.push(shift);
+  }
+  render();
+}
+
+let pending = null;
+container.addEventListener('scroll', () => {
+  if (pending === null) pending = setTimeout(() => { pending = null; render(); }, RENDER_LATENCY_MS);
+});
+document.getElementById('filter-button').addEventListener('click', () => {
+  document.getElementById('colleague-shifts').checked = localStorage.getItem('colleagueFilter') === '1';
+  panel.style.display = 'block';
+});
+document.getElementById('apply-filter').addEventListener('click', () => {
+  localStorage.setItem('colleagueFilter', document.getElementById('colleague-shifts').checked ? '1' : '0');
+  panel.style.display = 'none';
+  container.scrollTop = 0;
+  load();
+});
+load();
+</script>
+</body></html>
+"""
+
+def to_payload_shift(shift):
+    """Raw shift dict -> the Quinyx-style record served by the schedule API."""
+    day = datetime.strptime(shift["date"], "%Y-%m-%d")
+    begin = datetime.combine(day, datetime.strptime(shift["start"], "%H:%M").time())
+    end = datetime.combine(day, datetime.strptime(shift["end"], "%H:%M").time())
+    if end <= begin:
+        end += timedelta(days=1)
+    return {
+        "employeeName": shift["name"],
+        "begin": begin.isoformat(),
+        "end": end.isoformat(),
+        "shiftTypeName": shift["role"],
+    }
+
+class QuinyxStandin:
+    """aiohttp app serving a fixed set of shifts the way the staff portal does."""
+
+    def __init__(self, shifts, me=None, render_latency_ms=30, api_latency_ms=100,
+                 item_height=44, viewport_height=600):
+        self.shifts = sorted(shifts, key=lambda s: (s["date"], s["start"], s["name"], s["role"]))
+        self.me = me or (self.shifts[0]["name"] if self.shifts else None)
+        self.render_latency_ms = render_latency_ms
+        self.api_latency_ms = api_latency_ms
+        self.item_height = item_height
+        self.viewport_height = viewport_height
+        self.sessions = set()
+        self.requests = Counter()
+        self._runner = None
+        self.url = None
+
+        self.app = web.Application(middlewares=[self._count])
+        self.app.router.add_get("/", self.login_page)
+        self.app.router.add_post("/login", self.login)
+        self.app.router.add_get("/staffPortal", self.home)
+        self.app.router.add_get("/staffPortal/schedule", self.schedule_page)
+        self.app.router.add_get("/api/schedule/shifts", self.schedule_api)
+
+    @web.middleware
+    async def _count(self, request, handler):
+        self.requests[request.path] += 1
+        return await handler(request)
+
+    def _logged_in(self, request):
+        return request.cookies.get(SESSION_COOKIE) in self.sessions
+
+    async def login_page(self, request):
+        return web.Response(text=LOGIN_HTML, content_type="text/html")
+
+    async def login(self, request):
+        body = await request.json()
+        if not body.get("email") or not body.get("password"):
+            return web.json_response({"error": "missing credentials"}, status=401)
+        token = secrets.token_hex(16)
+        self.sessions.add(token)
+        response = web.json_response({"ok": True})
+        response.set_cookie(SESSION_COOKIE, token)
+        return response
+
+    async def home(self, request):
+        if not self._logged_in(request):
+            raise web.HTTPFound("/")
+        return web.Response(text=HOME_HTML, content_type="text/html")
+
+    async def schedule_page(self, request):
+        # Like Quinyx, an expired session just gets the login form in place of the page
+        if not self._logged_in(request):
+            return await self.login_page(request)
+        html = (SCHEDULE_HTML
+                .replace("__ITEM_HEIGHT__", str(self.item_height))
+                .replace("__VIEWPORT_HEIGHT__", str(self.viewport_height))
+                .replace("__RENDER_LATENCY_MS__", str(self.render_latency_ms)))
+        return web.Response(text=html, content_type="text/html")
+
+    async def schedule_api(self, request):
+        if not self._logged_in(request):
+            return web.json_response({"error": "unauthorized"}, status=401)
+        from_date = request.query.get("fromDate") or ""
+        to_date = request.query.get("toDate") or "9999-12-31"
+        colleagues = request.query.get("colleagues") == "1"
+        shifts = [
+            to_payload_shift(s) for s in self.shifts
+            if from_date <= s["date"] <= to_date and (colleagues or s["name"] == self.me)
+        ]
+        if self.api_latency_ms:
+            await asyncio.sleep(self.api_latency_ms / 1000)
+        return web.json_response({"shifts": shifts})
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+        self._runner = None
+
+async def serve(args):
+    shifts = generate_rota(args.staff, args.weeks, seed=args.seed)
+    standin = QuinyxStandin(shifts, render_latency_ms=args.render_latency, api_latency_ms=args.api_latency)
+    url = await standin.start(port=args.port)
+    first, last = shifts[0]["date"], max(s["date"] for s in shifts)
+    print(f"Quinyx stand-in with {len(shifts)} shifts ({first} to {last}) at {url}")
+    print(f"Schedule: {url}/staffPortal/schedule?dateOption=week&fromDate={first}&toDate={last}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await standin.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--staff", type=int, default=200)
+    parser.add_argument("--weeks", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--render-latency", type=int, default=30, help="ms before the list re-renders after a scroll")
+    parser.add_argument("--api-latency", type=int, default=100, help="ms added to every schedule API response")
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,39 @@
+"""Replay schedule API payloads recorded with QUINYX_RECORD_DIR through the parser.
+
+Run from the repo root:  python -m benchmarks.replay_payloads DIR [--update]
+Parses the numbered captures in DIR the way a network-mode fetch does and
+compares the shifts with DIR/expected.json, failing on any difference.
+--update (re)writes expected.json from the current parser instead, e.g.
+after recording a fresh set of responses from the real site.
+"""
+import argparse
+import json
+import os
+
+from quinyx_scraper import load_recorded_payloads, shifts_from_payloads
+from benchmarks.bench_scraper import check_exact
+
+def main(args):
+    payloads = load_recorded_payloads(args.directory)
+    if not payloads:
+        raise SystemExit(f"No recorded payloads (001.json, 002.json, ...) in {args.directory}")
+    shifts = shifts_from_payloads(payloads, args.name)
+    expected_path = os.path.join(args.directory, "expected.json")
+    if args.update:
+        with open(expected_path, "w") as f:
+            json.dump(sorted(shifts, key=lambda s: (s["date"], s["start"], s["name"], s["role"])), f, indent=2)
+        print(f"Wrote {len(shifts)} shifts from {len(payloads)} payloads to {expected_path}")
+        return
+    if not os.path.exists(expected_path):
+        raise SystemExit(f"No {expected_path} yet; check the parsed shifts and run again with --update")
+    with open(expected_path, "r") as f:
+        expected = json.load(f)
+    check_exact(shifts, expected)
+    print(f"{len(shifts)} shifts from {len(payloads)} payloads match {expected_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="a QUINYX_RECORD_DIR capture")
+    parser.add_argument("--name", help="only one person's shifts, as fetch_user_shifts(name) would")
+    parser.add_argument("--update", action="store_true", help="write expected.json instead of checking it")
+    main(parser.parse_args())
@@ -0,0 +1,56 @@
+"""Seeded synthetic rota generator, shaped like the shifts the scraper returns."""
+import random
+from datetime import date, timedelta
+
+# (role, weight) roughly matching the mix in shifts_cache.json
+ROLE_MIX = [
+    ("FAB Serving", 18), ("Ushering", 14), ("Kiosk Host", 12), ("Barista", 8),
+    ("FAB Order Maker", 8), ("Kitchen Assistant", 6), ("CEM", 6), ("Runner", 5),
+    ("FAB Runner / Prep", 5), ("Bright Lights", 4), ("Cinema Manager", 3),
+    ("Ushering GSP", 3), ("Other", 2),
+]
+# Opening, mid and closing patterns; the closes run past midnight
+SHIFT_PATTERNS = [
+    ("09:00", "16:45"), ("10:00", "17:30"), ("11:00", "18:00"), ("12:00", "19:30"),
+    ("14:00", "21:00"), ("16:45", "00:30"), ("17:45", "00:15"), ("18:00", "00:30"),
+]
+FIRST_NAMES = [
+    "Sam", "Arthur", "Georgia", "Elfie", "Thomas", "Anna", "Kirstie", "George", "Timothy",
+    "Sophie", "Oliver", "Amelia", "Harry", "Isla", "Jack", "Mia", "Noah", "Ella", "Leo", "Grace",
+]
+LAST_NAMES = [
+    "Sheldrake", "Dunn", "Doman", "Corbyn-smith", "Cutmore", "Stephenson", "Sutton", "Sinclair",
+    "White", "Shepherd", "Hoggarth", "Pridige", "Walker", "Hughes", "Patel", "Khan", "Evans", "Price",
+]
+
+def staff_names(count, rng):
+    names = set()
+    while len(names) < count:
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        if name in names:
+            name = f"{name} {len(names)}"
+        names.add(name)
+    return sorted(names)
+
+def generate_rota(staff=200, weeks=4, start=None, seed=0):
+    """Raw shift dicts ({name, date, start, end, role}, ISO dates) for staff x weeks."""
+    rng = random.Random(seed)
+    start = start or date.today() - timedelta(days=1)
+    roles, weights = zip(*ROLE_MIX)
+    shifts = []
+    for name in staff_names(staff, rng):
+        main_role = rng.choices(roles, weights)[0]
+        for week in range(weeks):
+            week_start = start + timedelta(weeks=week)
+            for offset in sorted(rng.sample(range(7), rng.randint(3, 5))):
+                day = week_start + timedelta(days=offset)
+                role = main_role if rng.random() < 0.8 else rng.choices(roles, weights)[0]
+                shift_start, shift_end = rng.choice(SHIFT_PATTERNS)
+                shifts.append({
+                    "name": name,
+                    "date": day.isoformat(),
+                    "start": shift_start,
+                    "end": shift_end,
+                    "role": role,
+                })
+    return shifts
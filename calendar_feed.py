@@ -0,0 +1,223 @@
+import asyncio
+import hashlib
+import hmac
+import os
+import re
+from datetime import timedelta
+from urllib.parse import quote
+from aiohttp import web
+from utils import store, start_minutes
+from user_registry import registry
+from metrics import metrics
+
+# Port for the .ics feed server (e.g. ICS_PORT=8080); unset to not serve feeds
+ICS_PORT = int(os.getenv("ICS_PORT", "0")) or None
+ICS_HOST = os.getenv("ICS_HOST", "0.0.0.0")
+# How the feeds are reached from outside, for the links /calendar hands out
+ICS_BASE_URL = os.getenv("ICS_BASE_URL", f"http://localhost:{ICS_PORT}").rstrip("/")
+# Signs feed URLs so they can't be guessed; falls back to the bot token. Feeds aren't served without one
+ICS_SECRET = os.getenv("ICS_SECRET") or os.getenv("DISCORD_TOKEN") or ""
+# Calendar apps may reuse a feed this long before asking again (and then mostly get a 304)
+ICS_MAX_AGE_SECONDS = int(os.getenv("ICS_MAX_AGE_SECONDS", "300"))
+# Feeds are stored and streamed in pieces of about this size
+CHUNK_BYTES = 64 * 1024
+
+def feed_token(kind, key):
+    return hmac.new(ICS_SECRET.encode(), f"{kind}:{key}".encode(), hashlib.sha256).hexdigest()[:24]
+
+def user_feed_url(discord_id):
+    return f"{ICS_BASE_URL}/calendar/user/{discord_id}/{feed_token('user', discord_id)}.ics"
+
+def role_feed_url(role):
+    return f"{ICS_BASE_URL}/calendar/role/{quote(role, safe='')}/{feed_token('role', role.lower())}.ics"
+
+def ics_escape(text):
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def fold(line):
+    """Fold a content line at 75 octets, as RFC 5545 asks."""
+    raw = line.encode()
+    if len(raw) <= 75:
+        return line + "\r\n"
+    parts, start = [], 0
+    while start < len(raw):
+        end = min(start + (75 if not parts else 74), len(raw))
+        # Don't split a UTF-8 sequence
+        while end < len(raw) and raw[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(raw[start:end].decode())
+        start = end
+    return "\r\n ".join(parts) + "\r\n"
+
+def slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+def event_lines(s, summary):
+    day = s["date"]
+    uid = f"{day:%Y%m%d}-{s['start']}-{slug(s['name'])}-{slug(s['role'])}@rotabot"
+    lines = ["BEGIN:VEVENT", f"UID:{uid}", f"DTSTAMP:{day:%Y%m%d}T000000Z"]
+    if s["start"] is None or s["end"] is None:
+        lines += [f"DTSTART;VALUE=DATE:{day:%Y%m%d}", f"DTEND;VALUE=DATE:{day + timedelta(days=1):%Y%m%d}"]
+    else:
+        # Floating local times: the rota is always in the cinema's own time zone
+        end_day = day + timedelta(days=1) if s["overnight"] else day
+        lines += [
+            f"DTSTART:{day:%Y%m%d}T{s['start'] // 60 % 24:02d}{s['start'] % 60:02d}00",
+            f"DTEND:{end_day:%Y%m%d}T{s['end'] // 60 % 24:02d}{s['end'] % 60:02d}00",
+        ]
+    lines += [f"SUMMARY:{ics_escape(summary)}", f"DESCRIPTION:{ics_escape(', '.join(s['roles']) or s['role'])}", "END:VEVENT"]
+    return "".join(fold(l) for l in lines)
+
+def render_calendar(title, shifts, summary):
+    """(etag, [bytes chunks]) for a VCALENDAR of these shifts; summary(shift) names each event.
+
+    The ETag is a hash of the content, so a refetch that didn't touch these
+    shifts keeps answering 304 Not Modified.
+    """
+    header = "".join(fold(l) for l in [
+        "BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//rotabot//shifts//EN", "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH", f"X-WR-CALNAME:{ics_escape(title)}",
+        f"REFRESH-INTERVAL;VALUE=DURATION:PT{max(ICS_MAX_AGE_SECONDS // 60, 1)}M",
+    ])
+    digest = hashlib.blake2b(digest_size=16)
+    chunks, pending, size = [], [header], len(header)
+    ordered = sorted(shifts, key=lambda s: (s["date"], start_minutes(s), s["name"]))
+    for s in ordered + [None]:
+        text = event_lines(s, summary(s)) if s else "END:VCALENDAR\r\n"
+        pending.append(text)
+        size += len(text)
+        if size >= CHUNK_BYTES or s is None:
+            chunk = "".join(pending).encode()
+            digest.update(chunk)
+            chunks.append(chunk)
+            pending, size = [], 0
+    return f'"{digest.hexdigest()}"', chunks
+
+
+class FeedCache:
+    """Rendered feeds, each rebuilt at most once per snapshot version.
+
+    Requests for a feed that is being rendered wait for that render, which
+    runs in a worker thread.
+    """
+
+    def __init__(self):
+        self._feeds = {}
+        self._inflight = {}
+
+    async def get(self, key, version, render):
+        cached = self._feeds.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+        if (version, key) not in self._inflight:
+            self._inflight[(version, key)] = asyncio.ensure_future(asyncio.to_thread(render))
+        task = self._inflight[(version, key)]
+        try:
+            with metrics.timer("ics_render_seconds"):
+                feed = await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._inflight.pop((version, key), None)
+        # A slow render of an older snapshot doesn't replace a newer feed
+        if key not in self._feeds or self._feeds[key][0] <= version:
+            self._feeds[key] = (version, feed)
+        return feed
+
+
+feeds = FeedCache()
+
+def not_modified(request, etag):
+    tags = [t.strip() for t in request.headers.get("If-None-Match", "").split(",")]
+    return etag in tags or f"W/{etag}" in tags or "*" in tags
+
+async def send_feed(request, feed, filename):
+    if feed is None:
+        metrics.inc("ics_requests_total", status="404")
+        raise web.HTTPNotFound()
+    etag, chunks = feed
+    headers = {"ETag": etag, "Cache-Control": f"max-age={ICS_MAX_AGE_SECONDS}"}
+    if not_modified(request, etag):
+        metrics.inc("ics_requests_total", status="304")
+        return web.Response(status=304, headers=headers)
+    metrics.inc("ics_requests_total", status="200")
+    response = web.StreamResponse(headers={
+        **headers,
+        "Content-Type": "text/calendar; charset=utf-8",
+        "Content-Disposition": f'inline; filename="{filename}"',
+    })
+    response.content_length = sum(len(c) for c in chunks)
+    await response.prepare(request)
+    for chunk in chunks:
+        await response.write(chunk)
+    await response.write_eof()
+    return response
+
+def check_token(kind, key, token):
+    if not hmac.compare_digest(token, feed_token(kind, key)):
+        metrics.inc("ics_requests_total", status="403")
+        raise web.HTTPForbidden()
+
+async def user_feed(request):
+    discord_id = request.match_info["discord_id"]
+    check_token("user", discord_id, request.match_info["token"])
+    await store.refresh()
+    snapshot = store.snapshot
+    bound = registry.name_for(discord_id)
+    name = snapshot.name_index.best(bound) if bound else None
+    if not name:
+        return await send_feed(request, None, None)
+    feed = await feeds.get(
+        ("user", name),
+        snapshot.version,
+        lambda: render_calendar(f"Shifts: {name}", snapshot.by_name.get(name.lower(), []), lambda s: s["role"]),
+    )
+    return await send_feed(request, feed, f"{slug(name)}.ics")
+
+async def role_feed(request):
+    check_token("role", request.match_info["role"].lower(), request.match_info["token"])
+    await store.refresh()
+    snapshot = store.snapshot
+    role = snapshot.role_index.best(request.match_info["role"])
+    if not role or role.lower() != request.match_info["role"].lower():
+        return await send_feed(request, None, None)
+    feed = await feeds.get(
+        ("role", role),
+        snapshot.version,
+        lambda: render_calendar(f"Rota: {role}", snapshot.by_role.get(role.lower(), []), lambda s: s["name"]),
+    )
+    return await send_feed(request, feed, f"{slug(role)}.ics")
+
+
+class CalendarServer:
+    """aiohttp server for the feeds, on the bot's own event loop."""
+
+    def __init__(self, host=ICS_HOST, port=ICS_PORT):
+        self.host = host
+        self.port = port
+        self.app = web.Application()
+        self.app.router.add_get("/calendar/user/{discord_id}/{token}.ics", user_feed)
+        self.app.router.add_get("/calendar/role/{role}/{token}.ics", role_feed)
+        self._runner = None
+
+    @property
+    def running(self):
+        return self._runner is not None
+
+    async def start(self):
+        if self._runner:
+            return
+        if not ICS_SECRET:
+            print("Not serving calendar feeds: set ICS_SECRET (or DISCORD_TOKEN) so feed links can't be forged")
+            return
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        print(f"Serving calendar feeds on {self.host}:{self.port} ({ICS_BASE_URL})")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+        self._runner = None
+
+
+calendar_server = CalendarServer() if ICS_PORT else None
@@ -0,0 +1,47 @@
+from discord import app_commands
+import discord
+from utils import store, role_autocomplete
+from user_registry import registry
+from calendar_feed import calendar_server, user_feed_url, role_feed_url
+from metrics import metrics
+
+async def start_calendar_server():
+    """Serve the .ics feeds if ICS_PORT is set; safe to call on every on_ready."""
+    if calendar_server and not calendar_server.running:
+        try:
+            await calendar_server.start()
+        except OSError as e:
+            print(f"Couldn't start the calendar feed server: {e}")
+
+def webcal(url):
+    return "webcal://" + url.split("://", 1)[1]
+
+def register_calendar_command(bot):
+    tree = bot.tree
+
+    @tree.command(name="calendar", description="Get a calendar feed link for your shifts, or for a role.")
+    @app_commands.describe(role="A role's whole rota instead of your own shifts (optional)")
+    @app_commands.autocomplete(role=role_autocomplete)
+    @metrics.timed("command_seconds", command="calendar")
+    async def calendar_cmd(interaction: discord.Interaction, role: str = None):
+        metrics.observe_ack(interaction)
+        if not calendar_server or not calendar_server.running:
+            await interaction.response.send_message("Calendar feeds aren't enabled on this bot (ICS_PORT, ICS_SECRET).", ephemeral=True)
+            return
+        if role:
+            await store.refresh()
+            match = store.role_index.best(role)
+            if not match:
+                await interaction.response.send_message(f"❌ No role matching '{role}'.", ephemeral=True)
+                return
+            url, what = role_feed_url(match), f"the **{match}** rota"
+        else:
+            if not registry.name_for(interaction.user.id):
+                await interaction.response.send_message("❌ Bind your name with `/iam` first.", ephemeral=True)
+                return
+            url, what = user_feed_url(interaction.user.id), "your shifts"
+        await interaction.response.send_message(
+            f"📆 Calendar feed for {what}:\n{url}\n"
+            f"Subscribe to it in your calendar app (on iPhone, open <{webcal(url)}>). Keep the link to yourself.",
+            ephemeral=True,
+        )
@@ -1,12 +1,27 @@
 from discord import app_commands
 import discord
-from utils import fetch_and_cache
+from datetime import date, timedelta
+from utils import fetcher
+from metrics import metrics
 
 def register_fetch_command(bot):
     tree = bot.tree
 
     @tree.command(name="fetch", description="Webscrape and cache the latest rota.")
-    async def fetch_cmd(interaction: discord.Interaction):
+    @app_commands.describe(weeks="Weeks ahead to fetch (optional, defaults to the current rota week)")
+    @metrics.timed("command_seconds", command="fetch")
+    async def fetch_cmd(interaction: discord.Interaction, weeks: app_commands.Range[int, 1, 12] = None):
+        metrics.observe_ack(interaction)
         await interaction.response.defer(ephemeral=True)
-        await fetch_and_cache()
-        await interaction.followup.send("✅ Fetched and cached the latest shifts!")
+        if weeks:
+            today = date.today()
+            shifts, status = await fetcher.fetch(today - timedelta(days=1), today + timedelta(weeks=weeks))
+        else:
+            shifts, status = await fetcher.fetch()
+        if status == "joined":
+            await interaction.followup.send(f"⏳ A fetch was already running, joined it: {len(shifts)} shifts cached.")
+        elif status == "fresh":
+            await interaction.followup.send(f"✅ Shifts were fetched moments ago ({len(shifts)} cached), nothing to do.")
+        else:
+            changes = fetcher.last_diff.summary() if fetcher.last_diff else "no changes"
+            await interaction.followup.send(f"✅ Fetched and cached the latest shifts ({changes}).")
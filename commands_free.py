@@ -1,86 +1,119 @@
-
 from discord import app_commands
 import discord
-from utils import load_cache, parse_date, date_to_pretty, split_multi_field, day_autocomplete, name_autocomplete, role_autocomplete
+from utils import store, source_for, archived, reply, ensure_snapshot, fmt_minutes, hhmm_to_minutes, parse_day_arg, date_to_pretty, split_multi_field, day_autocomplete, name_autocomplete, role_autocomplete
+from responses import Answer, paginate_blocks, send_answer
+from query_cache import query_cache
+from availability import Availability, window_mask, mask_to_ranges, FULL_DAY
 from datetime import datetime, timedelta
-from collections import defaultdict
-
-def register_free_command(bot):
-    tree = bot.tree
-
-    @tree.command(name="free", description="Find when staff are free on specific days or overall.")
-    @app_commands.describe(names="Comma-separated staff names (optional)", days="Comma-separated days (e.g. Monday, Tuesday)")
-    @app_commands.autocomplete(names=name_autocomplete, days=day_autocomplete)
-    async def free_cmd(interaction: discord.Interaction, names: str = "", days: str = ""):
-        shifts = load_cache()
-        if not shifts:
-            await interaction.response.send_message("No cached data. Please run `/fetch` first.", ephemeral=True)
-            return
-
-        staff_list = [n.strip().title() for n in names.split(",") if n.strip()]
-        day_list = [d.strip().capitalize() for d in days.split(",") if d.strip()]
-        all_names = sorted(set(s["name"] for s in shifts if s.get("name")))
+from datetime import date as Date
+from metrics import metrics
 
-        if not staff_list and not day_list:
-            await interaction.response.send_message("Please provide at least a name or a day.", ephemeral=True)
-            return
+def fmt_slot(minutes):
+    return "24:00" if minutes >= 24 * 60 else fmt_minutes(minutes)
 
-        from datetime import date as Date
-        shifts_by_name = defaultdict(lambda: defaultdict(list))
-        shift_details = defaultdict(lambda: defaultdict(list))
+def day_header(date: Date) -> str:
+    return date.strftime("%A %d-%m-%y")
 
-        for s in shifts:
-            name = s.get("name", "").title()
-            date_obj, _ = parse_date(s.get("date", ""))
-            start, end, typ = s.get("start"), s.get("end"), s.get("type", "Shift")
-            if name and date_obj and start and end:
-                try:
-                    st = datetime.strptime(start, "%H:%M").time()
-                    en = datetime.strptime(end, "%H:%M").time()
-                    shifts_by_name[name][date_obj.date()].append((st, en))
-                    shift_details[name][date_obj.date()].append((st, en, typ))
-                except:
-                    continue
+async def free_query(names="", days="", from_time=None, to_time=None):
+    """Who is free on the given days; with from/to, free for that whole window rather than shift-free all day."""
+    # Resolve typed names through the shared name index; unknown names are kept as typed
+    staff_list = [store.name_index.best(n) or n.strip().title() for n in names.split(",") if n.strip()]
+    day_list = [d.strip().capitalize() for d in days.split(",") if d.strip()]
+    # Entries picked from day_autocomplete ("09 Jun Mon") pin an exact date
+    exact_days = {d for d in (parse_day_arg(x) for x in day_list) if d}
+    weekdays = {d for d in day_list if not parse_day_arg(d)}
 
-        all_dates = sorted({parse_date(s.get("date", ""))[0].date() for s in shifts if parse_date(s.get("date", ""))[0]})
+    mask = None
+    if from_time or to_time:
+        start_min = hhmm_to_minutes(from_time) if from_time else 0
+        end_min = hhmm_to_minutes(to_time) if to_time else 24 * 60
+        if start_min is None or end_min is None or end_min <= start_min:
+            return Answer(message="Times must be HH:MM, with `from` before `to`.", ephemeral=True)
+        mask = window_mask(start_min, end_min)
 
-        def day_header(date: Date) -> str:
-            return date.strftime("%A %d-%m-%y")
+    if not staff_list and not day_list:
+        return Answer(message="Please provide at least a name or a day.", ephemeral=True)
 
-        embeds = []
-        for day in all_dates:
-            if day_list and day.strftime("%A") not in day_list:
+    def build():
+        blocks = []
+        live = store.snapshot
+        # Exact dates outside the live snapshot come from the archive
+        for day in sorted(set(live.dates) | {d for d in exact_days if archived(d, live)}):
+            if day_list and day.strftime("%A") not in weekdays and day not in exact_days:
                 continue
+            source = source_for(day, live)
+            availability = source.derived(Availability)
+
+            # First shift per person on this day, straight from the date index
+            working = {}
+            for s in source.on_date(day):
+                if s["start"] is not None and s["end"] is not None:
+                    working.setdefault(s["name"].lower(), s)
 
             lines = []
             has_primary = False
-            for name in (staff_list if staff_list else all_names):
-                if shifts_by_name[name].get(day):
-                    st, en, typ = shift_details[name][day][0]
+            for name in (staff_list if staff_list else source.names):
+                shift = working.get(name.lower())
+                if mask is not None:
+                    busy = not availability.is_free(name, day, mask)
+                else:
+                    busy = shift is not None
+                if busy:
+                    if shift:
+                        st, en, typ = fmt_minutes(shift["start"]), fmt_minutes(shift["end"]), shift.get("type", "Shift")
+                        detail = f"{st}–{en}, **{typ}**"
+                    else:
+                        detail = "overnight shift from the day before"
                     if name in staff_list:
-                        lines.append(f"❌ **{name}** is working ({st.strftime('%H:%M')}–{en.strftime('%H:%M')}, **{typ}**)")
+                        lines.append(f"❌ **{name}** is working ({detail})")
                         has_primary = True
                     else:
                         lines.append(f"  ❌ {name} has a shift.")
                 else:
                     lines.append(f"✅ {name} is free.")
 
+            if len(staff_list) > 1:
+                together = mask_to_ranges(availability.common_free(staff_list, day, mask if mask is not None else FULL_DAY))
+                if together:
+                    lines.append("🕒 All free together: " + ", ".join(f"{fmt_slot(a)}–{fmt_slot(b)}" for a, b in together))
+                else:
+                    lines.append("🕒 No time when everyone is free.")
+
             if not lines:
                 continue
 
-            embed = discord.Embed(
-                title=day_header(day),
-                description="\n".join(lines),
-                color=0xABCDEF if has_primary else 0xDDDDDD
-            )
-            embeds.append(embed)
+            blocks.append({
+                "title": day_header(day),
+                "description": "\n".join(lines),
+                "color": 0xABCDEF if has_primary else 0xDDDDDD,
+            })
+        return paginate_blocks(blocks) if blocks else None
 
-        if not embeds:
-            if day_list and staff_list:
-                await interaction.response.send_message(
-                    f"{', '.join(staff_list)} are working on {', '.join(day_list)}.", ephemeral=False)
-            else:
-                await interaction.response.send_message("No free days found for the given criteria.", ephemeral=False)
-        else:
-            for e in embeds:
-                await interaction.followup.send(embed=e, ephemeral=False)
+    # Keyed on resolved dates, so "Today" asked after midnight isn't answered for yesterday
+    key = ("free", tuple(sorted(n.lower() for n in staff_list)), tuple(sorted(exact_days)), tuple(sorted(weekdays)), mask)
+    pages = await query_cache.get(key, build)
+
+    if pages is None:
+        if day_list and staff_list:
+            return Answer(message=f"{', '.join(staff_list)} are working on {', '.join(day_list)}.")
+        return Answer(message="No free days found for the given criteria.")
+    return Answer(pages)
+
+def register_free_command(bot):
+    tree = bot.tree
+
+    @tree.command(name="free", description="Find when staff are free on specific days or overall.")
+    @app_commands.describe(
+        names="Comma-separated staff names (optional)",
+        days="Comma-separated days (e.g. Monday, Tuesday)",
+        from_time="Only count shifts overlapping from this time, HH:MM (optional)",
+        to_time="...up to this time, HH:MM (optional)",
+    )
+    @app_commands.rename(from_time="from", to_time="to")
+    @app_commands.autocomplete(names=name_autocomplete, days=day_autocomplete)
+    @metrics.timed("command_seconds", command="free")
+    async def free_cmd(interaction: discord.Interaction, names: str = "", days: str = "", from_time: str = None, to_time: str = None):
+        if not await ensure_snapshot(interaction):
+            await reply(interaction, "No cached data. Please run `/fetch` first.", ephemeral=True)
+            return
+        await send_answer(interaction, free_query(names, days, from_time, to_time))
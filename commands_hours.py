@@ -0,0 +1,140 @@
+from discord import app_commands
+import discord
+from datetime import date, timedelta
+from utils import store, source_for, archived, reply, ensure_snapshot, parse_day_arg, date_to_pretty, split_multi_field, day_autocomplete, name_autocomplete, role_autocomplete
+from responses import Answer, paginate_fields, send_answer
+from query_cache import query_cache
+from hours import hours_rows, fmt_hours, rows_to_csv, week_start
+from metrics import metrics
+
+MAX_RANGE_DAYS = 366
+
+def resolve_range(week=None, from_day=None, to_day=None, today=None):
+    """(from_date, to_date) for the /hours arguments, or an error message. Defaults to this week."""
+    today = today or date.today()
+    if week:
+        offsets = {"this": 0, "last": -7, "next": 7}
+        anchor = today + timedelta(days=offsets[week.lower()]) if week.lower() in offsets else parse_day_arg(week)
+        if not anchor:
+            return f"Couldn't read the week '{week}'. Use this, last, next or a day in the week."
+        start = week_start(anchor)
+        return start, start + timedelta(days=6)
+    if from_day or to_day:
+        from_date = parse_day_arg(from_day) if from_day else None
+        to_date = parse_day_arg(to_day) if to_day else None
+        if (from_day and not from_date) or (to_day and not to_date):
+            return "Couldn't read those dates. Use e.g. 09 Jun Mon, 2025-06-09 or today."
+        from_date = from_date or week_start(to_date)
+        to_date = to_date or from_date + timedelta(days=6)
+        if to_date < from_date:
+            return "`from` has to be on or before `to`."
+        if (to_date - from_date).days >= MAX_RANGE_DAYS:
+            return f"Please pick a range of at most {MAX_RANGE_DAYS} days."
+        return from_date, to_date
+    start = week_start(today)
+    return start, start + timedelta(days=6)
+
+def period_label(period, by, from_date, to_date):
+    if by == "day":
+        return date_to_pretty(period)
+    if by == "week":
+        return f"w/c {date_to_pretty(period)}"
+    return f"{date_to_pretty(from_date)} – {date_to_pretty(to_date)}"
+
+def render(rows, by, from_date, to_date, title_bits):
+    """One section per person: total in the heading, a line per period with the role split."""
+    people = {}
+    for period, name, role, minutes in rows:
+        people.setdefault(name, {}).setdefault(period, {})[role] = minutes
+    sections = []
+    for name in sorted(people, key=str.lower):
+        periods = people[name]
+        total = sum(m for roles in periods.values() for m in roles.values())
+        lines = []
+        for period in sorted(periods):
+            roles = periods[period]
+            split = ", ".join(f"{role or 'No role'} {fmt_hours(m)}" for role, m in sorted(roles.items(), key=lambda r: -r[1]))
+            lines.append(f"{period_label(period, by, from_date, to_date)}: **{fmt_hours(sum(roles.values()))}** ({split})")
+        sections.append((f"{name} — {fmt_hours(total)}", lines))
+    return paginate_fields(
+        sections,
+        title="Hours Worked",
+        description=f"{date_to_pretty(from_date)} – {date_to_pretty(to_date)}" + "".join(f", **{b}**" for b in title_bits if b),
+    )
+
+async def hours_query(name=None, role=None, week=None, from_day=None, to_day=None, by="week", export=False):
+    """Hours per person and role for the resolved range, or the same rows as CSV bytes when export is set."""
+    span = resolve_range(week, from_day, to_day)
+    if isinstance(span, str):
+        return Answer(message=span, ephemeral=True)
+    from_date, to_date = span
+    names = split_multi_field(name) if name else []
+    roles = split_multi_field(role) if role else []
+
+    def build():
+        snapshot = store.snapshot
+        # Terms resolve through the same indexes as /rota; an archived range also knows its own staff
+        sources = [snapshot] + ([source_for(from_date, snapshot)] if archived(from_date, snapshot) else [])
+        exact_names = sorted({n for source in sources for n in source.matching_names(names)})
+        exact_roles = sorted({r for source in sources for r in source.matching_roles(roles)})
+        if (names and not exact_names) or (roles and not exact_roles):
+            return None
+        rows = hours_rows(snapshot, from_date, to_date, exact_names, exact_roles, by)
+        if not rows:
+            return None
+        if export:
+            return rows_to_csv(rows)
+        return render(rows, by, from_date, to_date, [name, role])
+
+    key = (
+        "hours",
+        from_date,
+        to_date,
+        tuple(sorted(n.lower() for n in names)),
+        tuple(sorted(r.lower() for r in roles)),
+        by,
+        export,
+    )
+    result = await query_cache.get(key, build)
+    if result is None:
+        return Answer(message="No hours found for that range and filters.", ephemeral=True)
+    if export:
+        filename = f"hours_{from_date:%Y%m%d}_{to_date:%Y%m%d}_{by}.csv"
+        return Answer(message=f"Hours from {date_to_pretty(from_date)} to {date_to_pretty(to_date)}, per {by}.", file=(filename, result))
+    return Answer(result)
+
+def register_hours_command(bot):
+    tree = bot.tree
+
+    @tree.command(name="hours", description="Hours worked per person, split by role, for a week or date range.")
+    @app_commands.describe(
+        name="Staff name(s), comma-separated (optional)",
+        role="Role(s), comma-separated (optional)",
+        week="this, last, next, or any day in the week (default: this week)",
+        from_day="Start of a custom range (optional)",
+        to_day="End of a custom range (optional)",
+        by="Break totals down per day, per week, or one total for the range",
+        csv="Attach the report as a CSV file instead",
+    )
+    @app_commands.rename(from_day="from", to_day="to")
+    @app_commands.choices(by=[
+        app_commands.Choice(name="Per week", value="week"),
+        app_commands.Choice(name="Per day", value="day"),
+        app_commands.Choice(name="Whole range", value="total"),
+    ])
+    @app_commands.autocomplete(name=name_autocomplete, role=role_autocomplete, week=day_autocomplete, from_day=day_autocomplete, to_day=day_autocomplete)
+    @metrics.timed("command_seconds", command="hours")
+    async def hours_cmd(
+        interaction: discord.Interaction,
+        name: str = None,
+        role: str = None,
+        week: str = None,
+        from_day: str = None,
+        to_day: str = None,
+        by: str = "week",
+        csv: bool = False,
+    ):
+        if not await ensure_snapshot(interaction):
+            await reply(interaction, "❌ No shift data. Please run `/fetch` first.", ephemeral=True)
+            return
+        await send_answer(interaction, hours_query(name, role, week, from_day, to_day, by, csv))
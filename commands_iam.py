@@ -1,27 +1,90 @@
 from discord import app_commands
 import discord
-import json
+from metrics import metrics
+from user_registry import registry
+from search_index import SearchIndex
+from utils import store, fetcher, start_minutes, fmt_minutes, date_to_pretty
 
-USERS_FILE = "users.json"
+# Discord rejects messages longer than this
+MAX_MESSAGE_CHARS = 2000
 
-def load_users():
-    try:
-        with open(USERS_FILE, "r") as f:
-            return json.load(f)
-    except:
-        return {}
+def describe_changes(diff):
+    """Lines for one person's RotaDiff, in date order."""
+    def when(s):
+        return f"{date_to_pretty(s['date'])} {fmt_minutes(s['start'])}–{fmt_minutes(s['end'])}"
+    entries = [(s, f"➕ {when(s)} ({s['role']})") for s in diff.added]
+    entries += [(s, f"➖ ~~{when(s)} ({s['role']})~~") for s in diff.removed]
+    for old, new in diff.changed:
+        role = new["role"] if old["role"] == new["role"] else f"{old['role']} → {new['role']}"
+        entries.append((new, f"🔁 {when(old)} → {fmt_minutes(new['start'])}–{fmt_minutes(new['end'])} ({role})"))
+    entries.sort(key=lambda e: (e[0]["date"], start_minutes(e[0])))
+    return [line for _, line in entries]
 
-def save_users(data):
-    with open(USERS_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+def change_message(lines):
+    message = "📅 Your rota changed:"
+    for i, line in enumerate(lines):
+        more = f"\n…and {len(lines) - i} more, see `/rota`"
+        if len(message) + 1 + len(line) + len(more) > MAX_MESSAGE_CHARS:
+            return message + more
+        message += "\n" + line
+    return message
+
+async def notify_subscribers(bot, diff):
+    """One DM per subscribed /iam user whose own shifts are in the diff.
+
+    Bindings resolve through the name index like /myshifts does, falling
+    back to the names in the diff for someone whose shifts were all removed.
+    """
+    names = store.snapshot.name_index
+    diff_names = SearchIndex(sorted({s["name"] for s in diff.added} | {s["name"] for s in diff.removed} | {new["name"] for _, new in diff.changed}))
+    for discord_id in list(registry.subscribers):
+        bound = registry.name_for(discord_id)
+        name = bound and (names.best(bound) or diff_names.best(bound))
+        lines = describe_changes(diff.for_name(name)) if name else []
+        if not lines:
+            continue
+        try:
+            user = bot.get_user(int(discord_id)) or await bot.fetch_user(int(discord_id))
+            await user.send(change_message(lines))
+            metrics.inc("change_dms_total", status="sent")
+        except discord.HTTPException as e:
+            metrics.inc("change_dms_total", status="failed")
+            print(f"Couldn't DM rota changes to {discord_id}: {e}")
 
 def register_iam_command(bot):
     tree = bot.tree
 
+    @fetcher.on_change
+    async def send_change_dms(diff):
+        await notify_subscribers(bot, diff)
+
     @tree.command(name="iam", description="Bind your Discord user to your real name for rota lookup.")
     @app_commands.describe(full_name="Your full name as on the rota")
+    @metrics.timed("command_seconds", command="iam")
     async def iam_cmd(interaction: discord.Interaction, full_name: str):
-        users = load_users()
-        users[str(interaction.user.id)] = full_name
-        save_users(users)
+        registry.bind(interaction.user.id, full_name)
+        metrics.observe_ack(interaction)
         await interaction.response.send_message(f"✅ Bound you to '{full_name}'.", ephemeral=True)
+
+    @tree.command(name="notify", description="Get a DM when a fetch finds changes to your shifts.")
+    @app_commands.describe(enabled="On to get change DMs, off to stop them")
+    @metrics.timed("command_seconds", command="notify")
+    async def notify_cmd(interaction: discord.Interaction, enabled: bool):
+        await store.refresh()
+        metrics.observe_ack(interaction)
+        bound = registry.name_for(interaction.user.id)
+        if enabled and not bound:
+            await interaction.response.send_message("❌ Bind your name with `/iam` first.", ephemeral=True)
+            return
+        name = store.name_index.best(bound) if bound else None
+        if enabled and not name:
+            await interaction.response.send_message(
+                f"❌ '{bound}' doesn't match anyone on the rota. Run `/iam` again with your name as it appears there.",
+                ephemeral=True,
+            )
+            return
+        registry.set_subscribed(interaction.user.id, enabled)
+        if enabled:
+            await interaction.response.send_message(f"🔔 You'll get a DM when shifts for '{name}' change.", ephemeral=True)
+        else:
+            await interaction.response.send_message("🔕 No more rota change DMs.", ephemeral=True)
@@ -0,0 +1,85 @@
+from discord import app_commands
+from discord.ext import tasks
+import discord
+import asyncio
+from datetime import datetime
+from metrics import metrics, METRICS_FILE, METRICS_WRITE_SECONDS, INTERACTION_DEADLINE_SECONDS
+from responses import paginate_fields, send_pages
+from utils import format_age
+
+def fmt_seconds(value):
+    return f"{value * 1000:.0f}ms" if value < 1 else f"{value:.2f}s"
+
+def histogram_lines(name, label=None):
+    """One line per label value: p50 / p95 / max and call count."""
+    lines = []
+    for labels, h in metrics.histogram_items(name):
+        key = labels.get(label, "all") if label else "all"
+        lines.append(
+            f"`{key}` {fmt_seconds(h.quantile(0.5))} / {fmt_seconds(h.quantile(0.95))} / "
+            f"{fmt_seconds(h.max)} ({h.count}x)"
+        )
+    return lines
+
+def stats_sections():
+    missed = metrics.counter_value("interaction_deadline_missed_total")
+    deferred = metrics.counter_value("deferred_answers_total")
+    scrapes = [
+        f"{dict(labels).get('result')}: {value}"
+        for (name, labels), value in sorted(metrics.counters.items()) if name == "scrapes_total"
+    ]
+    sections = [
+        ("Commands (p50 / p95 / max)", histogram_lines("command_seconds", "command")),
+        ("Acknowledged after (p50 / p95 / max)", histogram_lines("interaction_ack_seconds", "command") + [
+            f"Over the {INTERACTION_DEADLINE_SECONDS:.0f}s deadline: {missed}, deferred while building: {deferred}",
+        ]),
+        ("Autocomplete (p50 / p95 / max)", histogram_lines("autocomplete_seconds", "field")),
+        ("Scrapes", [
+            ", ".join(scrapes) or "none yet",
+            f"Shifts scraped: {metrics.counter_value('scraped_shifts_total')}, "
+            f"scroll rounds: {metrics.counter_value('scrape_scroll_rounds_total')}",
+        ] + histogram_lines("scrape_seconds") + histogram_lines("scrape_phase_seconds", "phase")),
+        ("Scraper waits (p50 / p95 / max)", histogram_lines("scrape_wait_seconds", "wait")),
+        ("Cache I/O", [
+            *(f"read {line}" for line in histogram_lines("cache_read_seconds")),
+            *(f"write {line}" for line in histogram_lines("cache_write_seconds")),
+            f"Read errors: {metrics.counter_value('cache_read_errors_total')}",
+        ]),
+    ]
+    for name, read in sorted(metrics.gauges.items()):
+        try:
+            value = read()
+        except Exception as e:
+            value = f"unavailable ({e})"
+        if isinstance(value, dict):
+            value = ", ".join(f"{k} {v}" for k, v in value.items())
+        sections.append((name.replace("_", " ").capitalize(), [str(value)]))
+    return [(heading, lines or ["no data yet"]) for heading, lines in sections]
+
+@tasks.loop(seconds=METRICS_WRITE_SECONDS)
+async def metrics_writer():
+    try:
+        await asyncio.to_thread(metrics.write_prometheus, METRICS_FILE)
+    except OSError as e:
+        print(f"Could not write metrics to {METRICS_FILE}: {e}")
+
+def start_metrics_writer():
+    """Write METRICS_FILE periodically, if configured; safe to call on every on_ready."""
+    if METRICS_FILE and metrics.enabled and not metrics_writer.is_running():
+        metrics_writer.start()
+
+def register_stats_command(bot):
+    tree = bot.tree
+
+    @tree.command(name="stats", description="Bot timings and counters (admins only).")
+    @app_commands.default_permissions(administrator=True)
+    async def stats_cmd(interaction: discord.Interaction):
+        if not interaction.permissions.administrator:
+            await interaction.response.send_message("Only server admins can see bot stats.", ephemeral=True)
+            return
+        if not metrics.enabled:
+            await interaction.response.send_message("Metrics are disabled (METRICS_ENABLED=0).", ephemeral=True)
+            return
+        uptime = format_age(datetime.now() - metrics.started_at).replace(" ago", "")
+        pages = paginate_fields(stats_sections(), title="Bot stats", description=f"Up {uptime}")
+        await send_pages(interaction, pages, ephemeral=True)
@@ -1,7 +1,80 @@
 from discord import app_commands
 import discord
-from utils import load_cache, parse_date, date_to_pretty, split_multi_field, day_autocomplete, name_autocomplete, role_autocomplete
-from datetime import datetime, timedelta
+from utils import store, source_for, reply, ensure_snapshot, parse_day_arg, fmt_minutes, date_to_pretty, split_multi_field, day_autocomplete, name_autocomplete, role_autocomplete
+from swap_engine import SwapEngine
+from responses import Answer, paginate_fields, paginate_blocks, send_answer
+from query_cache import query_cache
+from datetime import date, timedelta
+from metrics import metrics
+
+def describe_shift(shift):
+    return f"{shift['name']} {fmt_minutes(shift['start'])}–{fmt_minutes(shift['end'])} ({shift['role']})"
+
+async def swap_query(name=None, day=None, role=None, scope="shift"):
+    """Who could take the one shift the filters match, or with scope day/week a matrix for every shift."""
+    day_obj = parse_day_arg(day) if day else None
+    if scope in ("day", "week") and not day_obj:
+        day_obj = date.today()
+    names = [name] if name else None
+    roles = split_multi_field(role) if role else None
+
+    def build_matrix():
+        days = [day_obj + timedelta(days=i) for i in range(7 if scope == "week" else 1)]
+        live = store.snapshot
+        sections = []
+        for d in days:
+            source = source_for(d, live)
+            shifts = source.select(names=names, date=d, roles=roles)
+            if not shifts:
+                continue
+            lines = []
+            for shift, candidates in source.derived(SwapEngine).matrix(shifts):
+                who = ", ".join(candidates) if candidates else "Nobody eligible"
+                lines.append(f"**{describe_shift(shift)}**: {who}")
+            sections.append((date_to_pretty(d), lines))
+        if not sections:
+            return "No shifts found with those filters."
+        return paginate_fields(sections, title="Swap Matrix", color=discord.Color.green())
+
+    def build_single():
+        # Find the target shift
+        source = source_for(day_obj)
+        results = source.select(names=names, date=day_obj, roles=roles)
+        if day and not day_obj:
+            results = [s for s in results if day.lower() in date_to_pretty(s["date"]).lower()]
+
+        if len(results) == 0:
+            return "No shift found with those filters."
+        elif len(results) > 1:
+            return "More than one shift matches. Please refine your filters."
+
+        shift = results[0]
+        swappable_names = source.derived(SwapEngine).candidates(shift)
+        if swappable_names is None:
+            return "Target shift has invalid start/end time."
+
+        if not swappable_names:
+            msg = "No eligible staff can swap into this shift (based on rest rules & no double shift)."
+        else:
+            msg = "Eligible to swap in:\n" + "\n".join(f"• {n}" for n in swappable_names)
+
+        return paginate_blocks([{
+            "title": "Swap Candidates",
+            "description": f"Shift: **{shift['name']}** {date_to_pretty(shift['date'])} {fmt_minutes(shift['start'])}–{fmt_minutes(shift['end'])} ({shift['role']})\n\n{msg}",
+            "color": discord.Color.green() if swappable_names else discord.Color.red(),
+        }])
+
+    key = (
+        "swap",
+        scope,
+        (name or "").lower(),
+        day_obj or (day or "").lower(),
+        tuple(sorted(r.lower() for r in roles or [])),
+    )
+    result = await query_cache.get(key, build_matrix if scope in ("day", "week") else build_single)
+    if isinstance(result, str):
+        return Answer(message=result, ephemeral=True)
+    return Answer(result)
 
 def register_swap_command(bot):
     tree = bot.tree
@@ -10,131 +83,24 @@ def register_swap_command(bot):
     @app_commands.describe(
         name="Staff full name (optional)",
         day="Day (e.g., 09 Jun Mon or today, optional)",
-        role="Role(s), e.g. FAB Serving, FAB Kitchen Assistant (comma-separated, optional)"
+        role="Role(s), e.g. FAB Serving, FAB Kitchen Assistant (comma-separated, optional)",
+        scope="One shift (default), or cover candidates for every shift that day / week"
     )
+    @app_commands.choices(scope=[
+        app_commands.Choice(name="Single shift", value="shift"),
+        app_commands.Choice(name="Whole day", value="day"),
+        app_commands.Choice(name="Whole week", value="week"),
+    ])
     @app_commands.autocomplete(name=name_autocomplete, day=day_autocomplete, role=role_autocomplete)
+    @metrics.timed("command_seconds", command="swap")
     async def swap_cmd(
         interaction: discord.Interaction,
         name: str = None,
         day: str = None,
         role: str = None,
+        scope: str = "shift",
     ):
-        shifts = load_cache()
-        if not shifts:
-            await interaction.response.send_message("❌ No shift data. Please run `/fetch` first.", ephemeral=True)
-            return
-
-        # Find the target shift
-        now = datetime.now()
-        results = shifts
-        if name:
-            results = [s for s in results if name.lower() in s["name"].lower()]
-        if day:
-            # Accepts "today", "tomorrow", or "09 Jun" or "09 Jun Mon"
-            if day.lower() == "today":
-                day_obj = now
-            elif day.lower() == "tomorrow":
-                day_obj = now.replace(day=now.day + 1)
-            else:
-                try:
-                    date_parts = day.split()
-                    if len(date_parts) >= 2:
-                        day_num, month = date_parts[0], date_parts[1]
-                        year = now.year
-                        day_obj = datetime.strptime(f"{day_num} {month} {year}", "%d %b %Y")
-                    else:
-                        day_obj = None
-                except Exception:
-                    day_obj = None
-            if day_obj:
-                results = [
-                    s for s in results
-                    if "date" in s and s["date"] and
-                    parse_date(s["date"])[0] and
-                    parse_date(s["date"])[0].date() == day_obj.date()
-                ]
-            else:
-                results = [s for s in results if day.lower() in (s.get("date") or "").lower()]
-        if role:
-            role_filters = split_multi_field(role)
-            results = [
-                s for s in results
-                if any(r.lower() in (s.get("role") or "").lower() for r in role_filters)
-            ]
-
-        if len(results) == 0:
-            await interaction.response.send_message("No shift found with those filters.", ephemeral=True)
-            return
-        elif len(results) > 1:
-            await interaction.response.send_message("More than one shift matches. Please refine your filters.", ephemeral=True)
+        if not await ensure_snapshot(interaction):
+            await reply(interaction, "❌ No shift data. Please run `/fetch` first.", ephemeral=True)
             return
-
-        shift = results[0]
-        target_date_obj, _ = parse_date(shift.get("date") or "")
-        if not target_date_obj:
-            await interaction.response.send_message("Target shift has an invalid or missing date.", ephemeral=True)
-            return
-
-        # Shift time parsing
-        try:
-            shift_start = datetime.combine(target_date_obj.date(), datetime.strptime(shift['start'], "%H:%M").time())
-            shift_end = datetime.combine(target_date_obj.date(), datetime.strptime(shift['end'], "%H:%M").time())
-            if shift_end < shift_start:
-                # If end time is after midnight
-                shift_end = shift_end.replace(day=shift_end.day + 1)
-        except Exception as e:
-            await interaction.response.send_message("Target shift has invalid start/end time.", ephemeral=True)
-            return
-
-        all_names = set(s['name'] for s in shifts if s.get('name') and s['name'] != shift['name'])
-        ineligible_names = set()
-
-        # 1. Anyone with a shift on that same day (excluding the original person)
-        for s in shifts:
-            d, _ = parse_date(s.get("date") or "")
-            if not d or s['name'] == shift['name']:
-                continue
-            if d.date() == target_date_obj.date():
-                ineligible_names.add(s['name'])
-
-        # 2. Anyone with a shift previous day that ENDS less than 11.5h before this shift starts
-        prev_date = target_date_obj.replace(day=target_date_obj.day - 1)
-        eleven_half = 11.5 * 60 * 60  # seconds
-        for s in shifts:
-            d, _ = parse_date(s.get("date") or "")
-            if not d or s['name'] == shift['name']:
-                continue
-            if d.date() == prev_date.date():
-                try:
-                    prev_end = datetime.combine(d.date(), datetime.strptime(s['end'], "%H:%M").time())
-                    if prev_end < shift_start and (shift_start - prev_end).total_seconds() < eleven_half:
-                        ineligible_names.add(s['name'])
-                except:
-                    continue
-
-        # 3. Anyone with a shift next day that STARTS less than 11.5h after this shift ends
-        next_date = target_date_obj.replace(day=target_date_obj.day + 1)
-        for s in shifts:
-            d, _ = parse_date(s.get("date") or "")
-            if not d or s['name'] == shift['name']:
-                continue
-            if d.date() == next_date.date():
-                try:
-                    next_start = datetime.combine(d.date(), datetime.strptime(s['start'], "%H:%M").time())
-                    if next_start > shift_end and (next_start - shift_end).total_seconds() < eleven_half:
-                        ineligible_names.add(s['name'])
-                except:
-                    continue
-
-        swappable_names = sorted(all_names - ineligible_names)
-        if not swappable_names:
-            msg = "No eligible staff can swap into this shift (based on rest rules & no double shift)."
-        else:
-            msg = "Eligible to swap in:\n" + "\n".join(f"• {n}" for n in swappable_names)
-
-        embed = discord.Embed(
-            title=f"Swap Candidates",
-            description=f"Shift: **{shift['name']}** {shift.get('date','?')} {shift.get('start')}–{shift.get('end')} ({shift.get('role')})\n\n{msg}",
-            color=discord.Color.green() if swappable_names else discord.Color.red()
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=False)
+        await send_answer(interaction, swap_query(name, day, role, scope))
@@ -0,0 +1,155 @@
+import csv
+import io
+import threading
+from datetime import timedelta
+from utils import archived
+from shift_archive import archive
+
+def shift_minutes(s):
+    """Length of a normalized shift in minutes; overnight shifts run past midnight (17:45–00:15 is 390)."""
+    if s["start"] is None or s["end"] is None:
+        return 0
+    return s["end"] - s["start"] + (24 * 60 if s["overnight"] else 0)
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+def add_totals(target, totals, sign=1):
+    """target[name][role] += sign * totals[name][role], dropping anything that reaches zero."""
+    for name, roles in totals.items():
+        person = target.setdefault(name, {})
+        for role, minutes in roles.items():
+            person[role] = person.get(role, 0) + sign * minutes
+            if not person[role]:
+                del person[role]
+        if not person:
+            del target[name]
+
+class HoursAggregates:
+    """Minutes worked per person per day and per week, split by role.
+
+    Shifts count towards the day they start on. update() only recomputes
+    days whose shifts changed since the last snapshot, and moves each such
+    day's old totals out of (and new ones into) its week's rollup, so a
+    report never has to walk individual shifts. Updates build new dicts
+    rather than changing the published ones, so a report in another thread
+    keeps reading one consistent version.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.daily = {}
+        self.weekly = {}
+        self._signatures = {}
+        self._lock = threading.Lock()
+
+    def update(self, snapshot):
+        """Bring the totals up to date with snapshot; returns (daily, weekly)."""
+        with self._lock:
+            # An older snapshot (from a slow build) doesn't roll the totals back
+            if self.version is not None and snapshot.version <= self.version:
+                return self.daily, self.weekly
+            daily, weekly = dict(self.daily), dict(self.weekly)
+            for day in set(snapshot.by_date) | set(daily):
+                shifts = snapshot.by_date.get(day, [])
+                signature = tuple(sorted((s["name"], s["start"], s["end"], s["role"]) for s in shifts))
+                if self._signatures.get(day) == signature:
+                    continue
+                week = {name: dict(roles) for name, roles in weekly.get(week_start(day), {}).items()}
+                add_totals(week, daily.pop(day, {}), -1)
+                totals = {}
+                for s in shifts:
+                    minutes = shift_minutes(s)
+                    if minutes:
+                        person = totals.setdefault(s["name"], {})
+                        person[s["role"]] = person.get(s["role"], 0) + minutes
+                if totals:
+                    daily[day] = totals
+                    add_totals(week, totals)
+                if week:
+                    weekly[week_start(day)] = week
+                else:
+                    weekly.pop(week_start(day), None)
+                if shifts:
+                    self._signatures[day] = signature
+                else:
+                    self._signatures.pop(day, None)
+            self.daily, self.weekly = daily, weekly
+            self.version = snapshot.version
+            return daily, weekly
+
+
+aggregates = HoursAggregates()
+
+def hours_for(snapshot):
+    """(daily, weekly) totals for the live snapshot."""
+    return aggregates.update(snapshot)
+
+def period_totals(snapshot, from_date, to_date, by_day=False):
+    """[(period_start, {name: {role: minutes}})] covering from_date..to_date.
+
+    Whole weeks use the weekly rollups (live, or from the archive when the
+    week is outside the live snapshot); partial weeks, or by_day, use the
+    daily totals.
+    """
+    live_daily, live_weekly = hours_for(snapshot)
+    days = [from_date + timedelta(days=i) for i in range((to_date - from_date).days + 1)]
+    periods = []
+    live_weeks, archive_weeks, live_days, archive_days = [], [], [], []
+    i = 0
+    while i < len(days):
+        day = days[i]
+        week = days[i:i + 7]
+        if not by_day and day.weekday() == 0 and len(week) == 7:
+            if not any(archived(d, snapshot) for d in week):
+                live_weeks.append(day)
+                i += 7
+                continue
+            if all(archived(d, snapshot) for d in week):
+                archive_weeks.append(day)
+                i += 7
+                continue
+        (archive_days if archived(day, snapshot) else live_days).append(day)
+        i += 1
+    periods.extend((w, live_weekly.get(w, {})) for w in live_weeks)
+    periods.extend((d, live_daily.get(d, {})) for d in live_days)
+    if archive and archive_weeks:
+        weekly = archive.weekly_hours(archive_weeks[0], archive_weeks[-1])
+        periods.extend((w, weekly.get(w, {})) for w in archive_weeks)
+    if archive and archive_days:
+        daily = archive.daily_hours(archive_days[0], archive_days[-1])
+        periods.extend((d, daily.get(d, {})) for d in archive_days)
+    periods.sort(key=lambda p: p[0])
+    return periods
+
+def hours_rows(snapshot, from_date, to_date, names=None, roles=None, by="week"):
+    """Report rows (period, name, role, minutes), filtered to exactly these names/roles.
+
+    Resolve typed terms first (Snapshot.matching_names/matching_roles).
+    by is "day", "week" (per person per week) or "total" (per person over the range).
+    """
+    names = {n.lower() for n in names or []}
+    roles = {r.lower() for r in roles or []}
+    totals = {}
+    for start, people in period_totals(snapshot, from_date, to_date, by_day=(by == "day")):
+        period = start if by == "day" else week_start(start) if by == "week" else from_date
+        for name, person in people.items():
+            if names and name.lower() not in names:
+                continue
+            for role, minutes in person.items():
+                if roles and (role or "").lower() not in roles:
+                    continue
+                key = (period, name, role)
+                totals[key] = totals.get(key, 0) + minutes
+    return [(period, name, role, minutes) for (period, name, role), minutes in sorted(totals.items())]
+
+def fmt_hours(minutes):
+    return f"{minutes // 60}h {minutes % 60:02d}m"
+
+def rows_to_csv(rows):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["period_start", "name", "role", "minutes", "hours"])
+    for period, name, role, minutes in rows:
+        writer.writerow([period.isoformat(), name, role, minutes, f"{minutes / 60:.2f}"])
+    return out.getvalue().encode()
@@ -0,0 +1,221 @@
+import bisect
+import functools
+import os
+import time
+from datetime import datetime, timezone
+from atomic_file import write_atomic
+
+# METRICS_ENABLED=0 turns every hook below into an immediate return (and
+# timed() into a no-op decorator), so they can stay in hot paths.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Prometheus text-format file, rewritten every METRICS_WRITE_SECONDS (e.g. for
+# node_exporter's textfile collector); unset to skip
+METRICS_FILE = os.getenv("METRICS_FILE")
+METRICS_WRITE_SECONDS = int(os.getenv("METRICS_WRITE_SECONDS", "60"))
+METRICS_PREFIX = "rotabot_"
+
+# Discord drops an interaction that isn't acknowledged within 3 seconds
+INTERACTION_DEADLINE_SECONDS = 3.0
+# Upper bounds in seconds, from autocomplete keystrokes up to full scrapes
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (max for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "started")
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.started, **self.labels)
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+_NULL_TIMER = _NullTimer()
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+class Metrics:
+    """Process-wide counters and histograms, keyed by (name, labels).
+
+    inc() and observe() are plain dict updates; timer() is a context manager
+    and timed() a decorator for coroutine functions, both recording seconds.
+    Gauges are read on demand from functions registered with gauge().
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self.started_at = datetime.now()
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        # When a list, every inc/observe is also appended here as
+        # [kind, name, value, labels], so another process can replay it
+        self.journal = None
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + amount
+        if self.journal is not None:
+            self.journal.append(["inc", name, amount, labels])
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+        if self.journal is not None:
+            self.journal.append(["observe", name, value, labels])
+
+    def replay(self, entries):
+        """Apply journal entries recorded by another process."""
+        for kind, name, value, labels in entries:
+            if kind == "inc":
+                self.inc(name, value, **labels)
+            elif kind == "observe":
+                self.observe(name, value, **labels)
+
+    def timer(self, name, **labels):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def timed(self, name, **labels):
+        """Decorator recording how long each call of a coroutine function takes."""
+        def decorate(func):
+            if not self.enabled:
+                return func
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with _Timer(self, name, labels):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def gauge(self, name, read):
+        """Register read() -> number or {label_value: number} (labelled "key") as a gauge."""
+        self.gauges[name] = read
+
+    def observe_ack(self, interaction):
+        """Record how long after its creation an interaction is being acknowledged."""
+        if not self.enabled or getattr(interaction, "created_at", None) is None:
+            return
+        command = getattr(getattr(interaction, "command", None), "name", None) or "component"
+        elapsed = (datetime.now(timezone.utc) - interaction.created_at).total_seconds()
+        self.observe("interaction_ack_seconds", elapsed, command=command)
+        if elapsed > INTERACTION_DEADLINE_SECONDS:
+            self.inc("interaction_deadline_missed_total", command=command)
+
+    def counter_value(self, name):
+        return sum(v for (n, _), v in self.counters.items() if n == name)
+
+    def histogram_items(self, name):
+        """[(labels dict, Histogram)] for one metric name, sorted by labels."""
+        return sorted(
+            ((dict(labels), h) for (n, labels), h in self.histograms.items() if n == name),
+            key=lambda item: sorted(item[0].items()),
+        )
+
+    def _read_gauges(self):
+        values = {}
+        for name, read in self.gauges.items():
+            try:
+                value = read()
+            except Exception as e:
+                print(f"Metrics gauge {name} failed: {e}")
+                continue
+            if isinstance(value, dict):
+                values[name] = [((("key", k),), v) for k, v in value.items() if isinstance(v, (int, float))]
+            else:
+                values[name] = [((), value)]
+        return values
+
+    def render_prometheus(self):
+        lines = []
+        by_name = {}
+        for (name, labels), value in self.counters.items():
+            by_name.setdefault(name, []).append((labels, value))
+        for name, samples in sorted(by_name.items()):
+            lines.append(f"# TYPE {METRICS_PREFIX}{name} counter")
+            lines.extend(f"{METRICS_PREFIX}{name}{_label_text(labels)} {value}" for labels, value in sorted(samples))
+        by_name = {}
+        for (name, labels), histogram in self.histograms.items():
+            by_name.setdefault(name, []).append((labels, histogram))
+        for name, samples in sorted(by_name.items()):
+            full = METRICS_PREFIX + name
+            lines.append(f"# TYPE {full} histogram")
+            for labels, h in sorted(samples, key=lambda s: s[0]):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, h.counts):
+                    cumulative += count
+                    lines.append(f"{full}_bucket{_label_text(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{full}_bucket{_label_text(labels, [('le', '+Inf')])} {h.count}")
+                lines.append(f"{full}_sum{_label_text(labels)} {h.total:.6f}")
+                lines.append(f"{full}_count{_label_text(labels)} {h.count}")
+        for name, samples in sorted(self._read_gauges().items()):
+            lines.append(f"# TYPE {METRICS_PREFIX}{name} gauge")
+            lines.extend(f"{METRICS_PREFIX}{name}{_label_text(labels)} {value}" for labels, value in samples)
+        lines.append(f"# TYPE {METRICS_PREFIX}uptime_seconds gauge")
+        lines.append(f"{METRICS_PREFIX}uptime_seconds {(datetime.now() - self.started_at).total_seconds():.0f}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the text exposition atomically, so a scraper never reads half a file."""
+        write_atomic(path, self.render_prometheus().encode())
+
+
+metrics = Metrics()
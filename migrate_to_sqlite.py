@@ -0,0 +1,50 @@
+"""Import the JSON files into the SQLite archive.
+
+    python migrate_to_sqlite.py [--db shifts.db] [--shifts shifts.json shifts_cache.json] [--users users.json]
+
+Shift files are imported in the order given, each replacing the date range
+it covers, so list older exports first. Any cache format read_cache_file
+understands works (schema 2, the legacy list, or {"shifts", "last_fetch"}).
+Safe to re-run. Set SHIFT_DB to the same path for the bot to use it.
+"""
+import argparse
+import json
+import os
+from shift_archive import ShiftArchive, SHIFT_DB
+from utils import read_cache_file
+
+def import_shifts(archive, path):
+    fetched_at, shifts = read_cache_file(path)
+    if not shifts:
+        print(f"{path}: no shifts, skipped")
+        return
+    dates = [s["date"] for s in shifts]
+    archive.replace_window(shifts, min(dates), max(dates), fetched_at, source=f"import:{os.path.basename(path)}")
+    print(f"{path}: {len(shifts)} shifts, {min(dates)} to {max(dates)} (fetched {fetched_at:%Y-%m-%d %H:%M})")
+
+def import_users(archive, path):
+    with open(path, "r") as f:
+        users = json.load(f)
+    archive.set_users(users)
+    print(f"{path}: {len(users)} user bindings")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=SHIFT_DB or "shifts.db")
+    parser.add_argument("--shifts", nargs="*", default=["shifts.json", "shifts_cache.json"])
+    parser.add_argument("--users", default="users.json")
+    args = parser.parse_args()
+
+    archive = ShiftArchive(args.db)
+    for path in args.shifts:
+        if os.path.exists(path):
+            import_shifts(archive, path)
+        else:
+            print(f"{path}: not found, skipped")
+    if os.path.exists(args.users):
+        import_users(archive, args.users)
+    first, last = archive.date_range()
+    print(f"{args.db}: shifts from {first} to {last}")
+
+if __name__ == "__main__":
+    main()
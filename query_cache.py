@@ -0,0 +1,75 @@
+import asyncio
+import os
+from collections import OrderedDict
+from utils import store
+from metrics import metrics
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "256"))
+
+class QueryCache:
+    """LRU cache of built command results, keyed by normalized query.
+
+    Entries belong to one store.version and are all dropped as soon as a
+    fetch publishes new data. Identical queries arriving while one is being
+    built await that build instead of starting their own; the build itself
+    runs in a worker thread so it never holds up the gateway.
+    """
+
+    def __init__(self, maxsize=QUERY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+
+    def _check_version(self):
+        if self.version != store.version:
+            if self._entries:
+                print(f"Query cache reset for new rota data: {self.stats()}")
+            self._entries.clear()
+            self.version = store.version
+
+    async def get(self, key, build):
+        """Cached result for key, calling build() (a plain function) on a miss."""
+        self._check_version()
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        version = self.version
+        if (version, key) in self._inflight:
+            self.coalesced += 1
+            return await asyncio.shield(self._inflight[(version, key)])
+        self.misses += 1
+        task = asyncio.ensure_future(asyncio.to_thread(build))
+        self._inflight[(version, key)] = task
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            self._inflight.pop((version, key), None)
+        # Don't keep a result built from data that was replaced mid-build
+        if version == store.version:
+            self._check_version()
+            self._entries[key] = result
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "entries": len(self._entries),
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+        }
+
+
+query_cache = QueryCache()
+metrics.gauge("query_cache", query_cache.stats)
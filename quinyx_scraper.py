@@ -1,53 +1,335 @@
 # quinyx_scraper.py
 
-from playwright.async_api import async_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 import os
+import json
+import time
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from metrics import metrics
+from rota_window import default_fetch_window
 
 load_dotenv()
 EMAIL = os.getenv("QUINYX_EMAIL")
 PASSWORD = os.getenv("QUINYX_PASSWORD")
+# "network" reads the schedule API responses the page loads, falling back to
+# scrolling the list if none are seen; "dom" always scrolls.
+SCRAPE_MODE = os.getenv("QUINYX_SCRAPE_MODE", "network")
+# The cinema's own time zone: API timestamps with an offset are converted to its
+# wall-clock time, whatever zone the bot host runs in
+QUINYX_TIMEZONE = ZoneInfo(os.getenv("QUINYX_TIMEZONE", "Europe/London"))
+# If set, every captured schedule payload is written here as a JSON fixture
+# (replay them with python -m benchmarks.replay_payloads)
+RECORD_DIR = os.getenv("QUINYX_RECORD_DIR")
+SCHEDULE_URL_HINTS = ("schedule", "shift")
+# Playwright storage_state (cookies + local storage) so repeat fetches skip login
+STATE_FILE = os.getenv("QUINYX_STATE_FILE", "quinyx_state.json")
+PREFS_FILE = os.getenv("QUINYX_PREFS_FILE", "quinyx_prefs.json")
+# Keep Chromium running between fetches instead of relaunching it each time
+KEEP_WARM = os.getenv("QUINYX_KEEP_WARM", "0") == "1"
+# Point at benchmarks/quinyx_standin.py (e.g. http://127.0.0.1:8765) to scrape offline
+BASE_URL = os.getenv("QUINYX_BASE_URL", "https://web.quinyx.com").rstrip("/")
 
-async def fetch_user_shifts(target_name=None):
-    print(f"Fetching shifts for: {target_name or 'ALL STAFF'}")
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
+# Runs in the page: reads every rendered block in one round-trip instead of
+# several query_selector/text_content calls per block. Rows come back in
+# document order, each tagged with the header above it, or null for rows
+# above the viewport's first header (the caller knows which day those are).
+EXTRACT_VISIBLE_JS = """
+() => {
+    const DATE_SEL = 'span.text-uppercase.padding-1.padding-2-left.padding-2-right.bold.background-transparent-grey.font-small';
+    const ROW_CLASS = 'background-white padding-2 staff-portal-schedule__row';
+    const NAME_SEL = 'div.flex-row.overflow-ellipsis.d-block.max-width-100.padding-1-right';
+    const TIME_SEL = 'span.bold.display-inline-block';
+    const ROLE_SEL = 'span.display-inline-block.padding-1-left.max-width-50.overflow-ellipsis';
+    const text = (el, sel) => {
+        const found = el.querySelector(sel);
+        return found ? found.textContent.trim() : null;
+    };
+    let date = null;
+    const headers = [];
+    const rows = [];
+    for (const block of document.querySelectorAll('div.legacyDiv')) {
+        const header = text(block, DATE_SEL);
+        if (header !== null) {
+            date = header;
+            headers.push(header);
+            continue;
+        }
+        if (!(block.getAttribute('class') || '').includes(ROW_CLASS)) continue;
+        const time = text(block, TIME_SEL) || '?';
+        const [start, end] = time.includes('-') ? time.split('-').map(t => t.trim()) : ['?', '?'];
+        rows.push({date, name: text(block, NAME_SEL) || 'Unknown', start, end, role: text(block, ROLE_SEL) || '?'});
+    }
+    return {headers, rows};
+}
+"""
+
+# Scrolls by most of a viewport (keeping some overlap so no row is skipped)
+# and reports where it ended up, plus a signature of the rows rendered before
+# the scroll so the caller can wait for the list to re-render.
+SCROLL_STEP_JS = """
+(el) => {
+    const rows = document.querySelectorAll('div.staff-portal-schedule__row');
+    const signature = rows.length ? rows[0].textContent + '|' + rows[rows.length - 1].textContent : '';
+    const before = el.scrollTop;
+    el.scrollBy(0, Math.max(100, Math.floor(el.clientHeight * 0.9)));
+    return {signature, before, after: el.scrollTop};
+}
+"""
+
+ROWS_CHANGED_JS = """
+(previous) => {
+    const rows = document.querySelectorAll('div.staff-portal-schedule__row');
+    const signature = rows.length ? rows[0].textContent + '|' + rows[rows.length - 1].textContent : '';
+    return signature !== previous;
+}
+"""
+
+def header_to_date(date_text):
+    # "Mon, 09/06/2025" -> "2025-06-09"; anything else is kept as-is
+    try:
+        date_part = date_text.split(",")[1].strip()
+        return datetime.strptime(date_part, "%d/%m/%Y").strftime("%Y-%m-%d")
+    except Exception:
+        return date_text
+
+# --- Wait timings ---
+# How long each kind of wait actually took during the last fetch, so timeouts
+# can be sized from data rather than guessed.
+WAIT_TIMINGS = {}
+
+async def timed_wait(label, awaitable):
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        elapsed = time.perf_counter() - started
+        WAIT_TIMINGS.setdefault(label, []).append(elapsed)
+        metrics.observe("scrape_wait_seconds", elapsed, wait=label)
+
+async def settle(page, label, timeout=10000):
+    """Wait for network idle, but don't fail the scrape if the page keeps polling."""
+    try:
+        await timed_wait(label, page.wait_for_load_state("networkidle", timeout=timeout))
+    except PlaywrightTimeoutError:
+        print(f"{label}: network still busy after {timeout}ms, carrying on")
+
+def wait_timing_summary():
+    lines = []
+    for label, samples in WAIT_TIMINGS.items():
+        lines.append(f"{label}: {len(samples)}x, total {sum(samples):.2f}s, max {max(samples):.2f}s")
+    return "\n".join(lines)
+
+# --- Network capture ---
+# Quinyx field names vary between API versions, so shifts are recognised by
+# shape: any object with a start/end timestamp and an employee name.
+START_KEYS = ("begin", "start", "startTime", "startDateTime", "from")
+END_KEYS = ("end", "endTime", "endDateTime", "to")
+NAME_KEYS = ("employeeName", "staffName", "fullName")
+ROLE_KEYS = ("shiftTypeName", "shiftType", "roleName", "role", "sectionName")
+
+def _parse_timestamp(value):
+    if not isinstance(value, str) or "T" not in value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    # Offsets are converted to the cinema's wall-clock time, which is what the rota shows
+    return parsed.astimezone(QUINYX_TIMEZONE).replace(tzinfo=None) if parsed.tzinfo else parsed
+
+def _first(obj, keys):
+    for key in keys:
+        if obj.get(key) not in (None, ""):
+            return obj[key]
+    return None
+
+def _employee_name(obj):
+    name = _first(obj, NAME_KEYS)
+    if isinstance(name, str):
+        return name.strip()
+    employee = obj.get("employee")
+    if isinstance(employee, dict):
+        if employee.get("name"):
+            return str(employee["name"]).strip()
+        first = employee.get("givenName") or employee.get("firstName") or ""
+        last = employee.get("familyName") or employee.get("lastName") or ""
+        return f"{first} {last}".strip() or None
+    return None
+
+def _role_name(obj):
+    role = _first(obj, ROLE_KEYS)
+    if isinstance(role, dict):
+        role = role.get("name")
+    return str(role).strip() if role else "?"
+
+def parse_schedule_payload(payload):
+    """Pull shift dicts (same shape as the DOM scrape) out of a schedule API payload."""
+    shifts = []
+    stack = [payload]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, list):
+            stack.extend(reversed(obj))
+            continue
+        if not isinstance(obj, dict):
+            continue
+        start = _parse_timestamp(_first(obj, START_KEYS))
+        end = _parse_timestamp(_first(obj, END_KEYS))
+        name = _employee_name(obj)
+        if start and end and name:
+            shifts.append({
+                "name": name,
+                "date": start.strftime("%Y-%m-%d"),
+                "start": start.strftime("%H:%M"),
+                "end": end.strftime("%H:%M"),
+                "role": _role_name(obj),
+            })
+            continue
+        stack.extend(v for v in obj.values() if isinstance(v, (dict, list)))
+    return shifts
+
+def shifts_from_payloads(payloads, target_name=None):
+    seen_shifts = set()
+    shifts = []
+    for payload in payloads:
+        for shift in parse_schedule_payload(payload):
+            shift_key = (shift["name"], shift["date"], shift["start"], shift["end"], shift["role"])
+            if shift_key in seen_shifts:
+                continue
+            if (not target_name) or (target_name.lower() in shift["name"].lower()):
+                seen_shifts.add(shift_key)
+                shifts.append(shift)
+    return shifts
+
+def load_recorded_payloads(directory):
+    """Load payloads previously saved via QUINYX_RECORD_DIR, in capture order."""
+    payloads = []
+    for filename in sorted(os.listdir(directory)):
+        # Only the numbered captures, not e.g. the expected.json kept next to them
+        if filename.endswith(".json") and filename[:-5].isdigit():
+            with open(os.path.join(directory, filename), "r") as f:
+                payloads.append(json.load(f))
+    return payloads
+
+def capture_schedule_responses(page):
+    """Start collecting JSON schedule responses from the page; returns the (growing) list."""
+    payloads = []
+
+    async def on_response(response):
+        if response.request.resource_type not in ("xhr", "fetch"):
+            return
+        if not any(hint in response.url.lower() for hint in SCHEDULE_URL_HINTS):
+            return
+        if "json" not in (response.headers.get("content-type") or ""):
+            return
+        try:
+            payload = await response.json()
+        except Exception:
+            return
+        payloads.append(payload)
+        if RECORD_DIR:
+            os.makedirs(RECORD_DIR, exist_ok=True)
+            path = os.path.join(RECORD_DIR, f"{len(payloads):03d}.json")
+            with open(path, "w") as f:
+                json.dump(payload, f)
+
+    page.on("response", on_response)
+    return payloads
+
+
+class QuinyxSession:
+    """Long-lived Playwright browser/context with a persisted login.
+
+    The context is created from STATE_FILE when present, so a fetch only
+    logs in again once Quinyx bounces us back to the login form. Whether the
+    "Colleague's shift" filter has been saved on the account is remembered in
+    PREFS_FILE so the filter panel isn't reopened on every fetch.
+    """
+
+    def __init__(self, state_file=STATE_FILE, prefs_file=PREFS_FILE, keep_warm=KEEP_WARM):
+        self.state_file = state_file
+        self.prefs_file = prefs_file
+        self.keep_warm = keep_warm
+        self._playwright = None
+        self.browser = None
+        self.context = None
+        self.prefs = self._load_prefs()
+
+    def _load_prefs(self):
+        try:
+            with open(self.prefs_file, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_prefs(self):
+        with open(self.prefs_file, "w") as f:
+            json.dump(self.prefs, f)
+
+    async def new_page(self):
+        if self.context is None:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self.browser = await self._playwright.chromium.launch(headless=True)
+            state = self.state_file if os.path.exists(self.state_file) else None
+            if state is None:
+                # A fresh browser profile won't have the saved filter either
+                self.prefs.pop("colleague_filter", None)
+            self.context = await self.browser.new_context(storage_state=state)
+        return await self.context.new_page()
 
-        # --- Login ---
+    async def save_state(self):
+        await self.context.storage_state(path=self.state_file)
+
+    async def release(self, page):
+        await page.close()
+        if not self.keep_warm:
+            await self.close()
+
+    async def close(self):
+        if self.browser:
+            await self.browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+        self._playwright = self.browser = self.context = None
+
+    @metrics.timed("scrape_phase_seconds", phase="login")
+    async def login(self, page):
         print("Logging in...")
-        await page.goto("https://web.quinyx.com/")
+        await page.goto(f"{BASE_URL}/")
         await page.wait_for_selector('input[name="email"]', timeout=30000)
         await page.fill('input[name="email"]', EMAIL)
         await page.click('button[data-test-id="fetchLoginProvidersButton"]')
         await page.wait_for_selector('input[name="password"]', timeout=30000)
         await page.fill('input[name="password"]', PASSWORD)
         await page.click('button[data-test-id="logInButton"]')
-        await page.wait_for_timeout(5000)
-
-        # --- Go to custom schedule URL ---
-        from datetime import datetime, timedelta
+        await timed_wait("login", page.wait_for_selector('input[name="password"]', state="detached", timeout=30000))
+        await settle(page, "login_settle")
+        await self.save_state()
 
-        today = datetime.now()
-        from_date_obj = today - timedelta(days=1)
-        from_date = from_date_obj.strftime('%Y-%m-%d')
-
-        days_until_next_thursday = (3 - today.weekday() + 7) % 7
-        if days_until_next_thursday == 0:
-            days_until_next_thursday = 7
-        to_date_obj = today + timedelta(days=days_until_next_thursday)
-        to_date = to_date_obj.strftime('%Y-%m-%d')
-
-        url = f"https://web.quinyx.com/staffPortal/schedule?dateOption=week&fromDate={from_date}&toDate={to_date}"
-        print(f"Navigating to {url}")
+    @metrics.timed("scrape_phase_seconds", phase="navigate")
+    async def open_schedule(self, page, url):
+        """Navigate to the schedule, logging in first if the saved session has expired."""
         await page.goto(url)
-        await page.wait_for_timeout(3000)
+        await timed_wait("navigate", page.wait_for_selector('div.legacyDiv, input[name="email"]', timeout=30000))
+        if await page.query_selector('input[name="email"]'):
+            print("Session expired or missing, logging in again")
+            await self.login(page)
+            await page.goto(url)
+            await timed_wait("navigate", page.wait_for_selector('div.legacyDiv', timeout=30000))
+        await settle(page, "navigate_settle")
 
+    async def ensure_colleague_filter(self, page):
+        if self.prefs.get("colleague_filter"):
+            return
+        await self._apply_colleague_filter(page)
 
-        # --- Filter: Colleague's shift ---
+    @metrics.timed("scrape_phase_seconds", phase="filter")
+    async def _apply_colleague_filter(self, page):
         print("Looking for filter button...")
-        await page.wait_for_selector('div.legacyDiv.bold.hidden-sm', timeout=10000)
+        await timed_wait("filter_button", page.wait_for_selector('div.legacyDiv.bold.hidden-sm', timeout=10000))
         filter_divs = await page.query_selector_all('div.legacyDiv.bold.hidden-sm')
         for div in filter_divs:
             text = await div.text_content()
@@ -55,8 +337,7 @@ async def fetch_user_shifts(target_name=None):
                 await div.click()
                 print("Clicked the Filter button")
                 break
-        await page.wait_for_selector('div[data-test-id="detail-panel"]', timeout=10000)
-        await page.wait_for_selector('div[data-test-id="detail-panel"] div.padding-2-left', timeout=10000)
+        await timed_wait("filter_panel", page.wait_for_selector('div[data-test-id="detail-panel"] div.padding-2-left', timeout=10000))
         checkboxes = await page.query_selector_all('div[data-test-id="detail-panel"] input[type="checkbox"]')
         for cb in checkboxes:
             label = await cb.evaluate_handle('el => el.closest("label")')
@@ -69,85 +350,164 @@ async def fetch_user_shifts(target_name=None):
                         print("Enabled Colleague's shift filter")
                 break
         await page.click('div[data-test-id="detail-panel"] button[data-test-id="primaryActionButton"]')
-        await page.wait_for_timeout(2000)
-
-        # --- Find scroll container ---
-        print("Looking for scrollable schedule container...")
-        scroll_container = await page.query_selector("div[style*='overflow: auto']")
-        if not scroll_container:
-            print("ERROR: Could not find the scroll container! Aborting scroll.")
-            await browser.close()
-            return []
-
-        # --- SCROLL + SCRAPE LOOP ---
-        print("Begin scroll-and-scrape loop for virtualized list")
-        seen_shifts = set()
-        shifts = []
-        last_height = -1
-        max_scrolls = 70
-
-        current_date = None  # <--- Move this OUTSIDE the scroll loop
-
-        for scroll_round in range(max_scrolls):
-            # Scrape what's currently visible
-            all_blocks = await page.query_selector_all('div.legacyDiv')
-            for block in all_blocks:
-                # Date header?
-                date_span = await block.query_selector('span.text-uppercase.padding-1.padding-2-left.padding-2-right.bold.background-transparent-grey.font-small')
-                if date_span:
-                    date_text = (await date_span.text_content()).strip()
-                    try:
-                        date_part = date_text.split(",")[1].strip()
-                        date_obj = datetime.strptime(date_part, "%d/%m/%Y")
-                        current_date = date_obj.strftime("%a %d %b")
-                    except Exception as e:
-                        current_date = date_text
-                    continue
-
-                # Shift row?
-                class_attr = await block.get_attribute('class')
-                if not class_attr or 'background-white padding-2 staff-portal-schedule__row' not in class_attr:
-                    continue
-
-                # Extract shift info
-                name_div = await block.query_selector('div.flex-row.overflow-ellipsis.d-block.max-width-100.padding-1-right')
-                staff_name = (await name_div.text_content()).strip() if name_div else "Unknown"
-                time_span = await block.query_selector('span.bold.display-inline-block')
-                shift_time = (await time_span.text_content()).strip() if time_span else "?"
-                role_span = await block.query_selector('span.display-inline-block.padding-1-left.max-width-50.overflow-ellipsis')
-                role = (await role_span.text_content()).strip() if role_span else "?"
-
-                if shift_time and "-" in shift_time:
-                    start_time, end_time = [t.strip() for t in shift_time.split("-")]
-                else:
-                    start_time, end_time = ("?", "?")
-
-                # Compose a unique key to avoid duplicates (name+date+start+end+role)
-                shift_key = f"{staff_name}|{current_date}|{start_time}|{end_time}|{role}"
-                if shift_key in seen_shifts:
-                    continue
-
-                # Only add if the shift matches the requested name or all
-                if (not target_name) or (target_name.lower() in staff_name.lower()):
-                    shifts.append({
-                        "name": staff_name,
-                        "date": current_date if current_date else "Unknown",
-                        "start": start_time,
-                        "end": end_time,
-                        "role": role,
-                    })
-                    seen_shifts.add(shift_key)
-                    print(f"Shift: {staff_name} | {current_date} | {start_time}-{end_time} | {role}")
-
-            # Scroll further
-            prev_scroll = await scroll_container.evaluate("(el) => el.scrollTop")
-            await scroll_container.evaluate("(el) => el.scrollBy(0, 500)")
-            await page.wait_for_timeout(800)
-            new_scroll = await scroll_container.evaluate("(el) => el.scrollTop")
-            if new_scroll == prev_scroll:
+        await timed_wait("filter_apply", page.wait_for_selector('div[data-test-id="detail-panel"]', state="hidden", timeout=10000))
+        await settle(page, "filter_settle")
+        # Quinyx keeps the filter in the browser's storage, so persist it with the session
+        await self.save_state()
+        self.prefs["colleague_filter"] = True
+        self.save_prefs()
+
+
+session = QuinyxSession()
+
+async def fetch_user_shifts(target_name=None, from_date=None, to_date=None):
+    """Scrape shifts between from_date and to_date (inclusive dates, default_fetch_window() if omitted)."""
+    return [s async for day in stream_user_shifts(target_name, from_date, to_date) for s in day]
+
+async def stream_user_shifts(target_name=None, from_date=None, to_date=None):
+    """Like fetch_user_shifts, but yields each day's shifts as soon as the day is complete.
+
+    Days come in date order; a day can (rarely) be yielded again with rows
+    that only turned up after it was closed, so consumers should merge.
+    """
+    print(f"Fetching shifts for: {target_name or 'ALL STAFF'}")
+    WAIT_TIMINGS.clear()
+    if from_date is None or to_date is None:
+        from_date, to_date = default_fetch_window()
+    started = time.perf_counter()
+    scraped = 0
+    page = await session.new_page()
+    try:
+        async for day in iter_schedule_days(page, target_name, from_date, to_date):
+            scraped += len(day)
+            yield day
+        metrics.inc("scrapes_total", result="ok")
+    except Exception:
+        metrics.inc("scrapes_total", result="error")
+        raise
+    finally:
+        metrics.inc("scraped_shifts_total", scraped)
+        metrics.observe("scrape_seconds", time.perf_counter() - started)
+        await session.release(page)
+        print("Wait timings:\n" + wait_timing_summary())
+
+def group_by_day(shifts):
+    days = {}
+    for shift in shifts:
+        days.setdefault(shift["date"], []).append(shift)
+    return [days[d] for d in sorted(days)]
+
+async def iter_schedule_days(page, target_name, from_date, to_date):
+    # --- Go to custom schedule URL ---
+    url = f"{BASE_URL}/staffPortal/schedule?dateOption=week&fromDate={from_date:%Y-%m-%d}&toDate={to_date:%Y-%m-%d}"
+    print(f"Navigating to {url}")
+    payloads = capture_schedule_responses(page)
+    await session.open_schedule(page, url)
+
+    # --- Filter: Colleague's shift ---
+    await session.ensure_colleague_filter(page)
+
+    if SCRAPE_MODE == "network":
+        with metrics.timer("scrape_phase_seconds", phase="payloads"):
+            await settle(page, "payloads")
+            shifts = shifts_from_payloads(payloads, target_name)
+        if shifts:
+            print(f"Returning {len(shifts)} shifts from {len(payloads)} schedule responses")
+            for day in group_by_day(shifts):
+                yield day
+            return
+        print("No schedule payloads seen, falling back to scrolling the list")
+
+    # --- Find scroll container ---
+    print("Looking for scrollable schedule container...")
+    scroll_container = await page.query_selector("div[style*='overflow: auto']")
+    if not scroll_container:
+        print("ERROR: Could not find the scroll container! Aborting scroll.")
+        return
+
+    # --- SCROLL + SCRAPE LOOP ---
+    print("Begin scroll-and-scrape loop for virtualized list")
+    scroll_started = time.perf_counter()
+    # Dedup keys, per day; only the open day and the one before it are kept,
+    # since the scroll overlap never reaches further back than that
+    seen_by_day = {}
+    open_day, day_shifts = None, []
+    closed_days = set()
+    returned = 0
+    max_scrolls = 200  # safety net; the loop normally ends at the bottom of the list
+
+    headers = []  # date headers in the order they scrolled past
+
+    for scroll_round in range(max_scrolls):
+        # Scrape what's currently visible in a single evaluate call
+        visible = await page.evaluate(EXTRACT_VISIBLE_JS)
+        # Rows above the first header belong to the last header seen, unless
+        # that same header is showing again (scroll overlap), in which case
+        # they're the tail of the day before it.
+        if visible["headers"] and headers and visible["headers"][0] == headers[-1]:
+            leading = headers[-2] if len(headers) > 1 else None
+        else:
+            leading = headers[-1] if headers else None
+        for header in visible["headers"]:
+            if header not in headers:
+                headers.append(header)
+
+        late = []
+        for row in visible["rows"]:
+            header = row["date"] or leading
+            current_date = header_to_date(header) if header else "Unknown"
+            staff_name, start_time, end_time, role = row["name"], row["start"], row["end"], row["role"]
+
+            # Compose a unique key to avoid duplicates (name+date+start+end+role)
+            shift_key = (staff_name, current_date, start_time, end_time, role)
+            seen = seen_by_day.setdefault(current_date, set())
+            if shift_key in seen:
+                continue
+            seen.add(shift_key)
+
+            if current_date != open_day and current_date not in closed_days:
+                # The list is in date order, so a new date closes the open day
+                if day_shifts:
+                    returned += len(day_shifts)
+                    yield day_shifts
+                closed_days.add(open_day)
+                open_day, day_shifts = current_date, []
+                for old in list(seen_by_day)[:-2]:
+                    del seen_by_day[old]
+
+            # Only add if the shift matches the requested name or all
+            if (not target_name) or (target_name.lower() in staff_name.lower()):
+                shift = {
+                    "name": staff_name,
+                    "date": current_date,
+                    "start": start_time,
+                    "end": end_time,
+                    "role": role,
+                }
+                # A row for an already-yielded day goes out on its own straight away
+                (day_shifts if current_date == open_day else late).append(shift)
+                print(f"Shift: {staff_name} | {current_date} | {start_time}-{end_time} | {role}")
+        if late:
+            returned += len(late)
+            yield late
+
+        # Scroll further and wait for the virtualized list to render the new rows
+        step = await scroll_container.evaluate(SCROLL_STEP_JS)
+        if step["after"] == step["before"]:
+            # At the bottom: give a lazy "load more" a chance before giving up
+            await settle(page, "scroll_end", timeout=3000)
+            step = await scroll_container.evaluate(SCROLL_STEP_JS)
+            if step["after"] == step["before"]:
                 print(f"End of scroll region reached after {scroll_round+1} scrolls.")
                 break
+        try:
+            await timed_wait("scroll_render", page.wait_for_function(ROWS_CHANGED_JS, arg=step["signature"], timeout=5000))
+        except PlaywrightTimeoutError:
+            pass
 
-        print(f"Returning {len(shifts)} shifts for {target_name or 'all staff'}")
-        await browser.close()
-        return shifts
+    if day_shifts:
+        returned += len(day_shifts)
+        yield day_shifts
+    metrics.observe("scrape_phase_seconds", time.perf_counter() - scroll_started, phase="scroll")
+    metrics.inc("scrape_scroll_rounds_total", scroll_round + 1)
+    print(f"Returning {returned} shifts for {target_name or 'all staff'}")
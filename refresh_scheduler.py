@@ -0,0 +1,107 @@
+import os
+import random
+from datetime import datetime, timedelta
+from discord.ext import tasks
+from utils import store, fetcher, default_fetch_window
+
+REFRESH_INTERVAL_MINUTES = float(os.getenv("REFRESH_INTERVAL_MINUTES", "240"))
+REFRESH_JITTER_MINUTES = float(os.getenv("REFRESH_JITTER_MINUTES", "15"))
+# First retry after a failed scrape; doubles per consecutive failure, capped at the interval
+REFRESH_RETRY_MINUTES = float(os.getenv("REFRESH_RETRY_MINUTES", "5"))
+# Local hours with no routine refreshes, e.g. "1-7"; an empty cache still gets fetched
+REFRESH_QUIET_HOURS = os.getenv("REFRESH_QUIET_HOURS", "")
+# Weeks beyond the current rota week to keep cached, refreshed every REFRESH_FAR_HOURS
+REFRESH_FAR_WEEKS = int(os.getenv("REFRESH_FAR_WEEKS", "0"))
+REFRESH_FAR_HOURS = float(os.getenv("REFRESH_FAR_HOURS", "24"))
+
+def parse_quiet_hours(spec):
+    try:
+        start, end = (int(h) for h in spec.split("-"))
+        return start, end
+    except ValueError:
+        return None
+
+class RefreshScheduler:
+    """Background stale-while-revalidate refresh of the shift cache.
+
+    Ticks once a minute and decides whether a scrape is due, so commands keep
+    answering from the current snapshot while it runs. The near-term window
+    (default_fetch_window) is refreshed every REFRESH_INTERVAL_MINUTES with
+    jitter, or straight away (once) when the cache stops covering today or
+    the end of the rota week. Failures back off exponentially.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.quiet_hours = parse_quiet_hours(REFRESH_QUIET_HOURS)
+        self.next_near = None  # None means due now
+        self.next_far = None
+        self.failures = 0
+        self.early_refresh_for = None
+        self.loop = tasks.loop(minutes=1)(self._tick)
+        self.loop.before_loop(self.bot.wait_until_ready)
+
+    def start(self):
+        if not self.loop.is_running():
+            self.loop.start()
+
+    def in_quiet_hours(self, now):
+        if not self.quiet_hours:
+            return False
+        start, end = self.quiet_hours
+        if start <= end:
+            return start <= now.hour < end
+        return now.hour >= start or now.hour < end
+
+    def uncovered(self, today):
+        """Which of today and the end of the rota week the cache is missing."""
+        _, rota_end = default_fetch_window(today)
+        return tuple(d for d in (today, rota_end) if not store.covers(d))
+
+    def _after_interval(self, now, minutes):
+        jitter = random.uniform(-REFRESH_JITTER_MINUTES, REFRESH_JITTER_MINUTES)
+        return now + timedelta(minutes=max(1, minutes + jitter))
+
+    def _after_failure(self, now):
+        delay = min(REFRESH_RETRY_MINUTES * 2 ** (self.failures - 1), REFRESH_INTERVAL_MINUTES)
+        return now + timedelta(minutes=delay)
+
+    async def _tick(self):
+        await store.refresh()
+        now = datetime.now()
+        missing = self.uncovered(now.date())
+        due = self.next_near is None or now >= self.next_near
+        # A stale cache jumps the queue once per set of missing dates, unless
+        # we're backing off after failures. A day the scrape can't fill (not
+        # published yet, or closed) then waits for the normal schedule.
+        if missing and self.failures == 0 and missing != self.early_refresh_for:
+            self.early_refresh_for = missing
+            due = True
+        if due and (not self.in_quiet_hours(now) or not store.all()):
+            await self._refresh_near(now)
+        if REFRESH_FAR_WEEKS and (self.next_far is None or now >= self.next_far) and not self.in_quiet_hours(now):
+            await self._refresh_far(now)
+
+    async def _refresh_near(self, now):
+        try:
+            _, status = await fetcher.fetch()
+        except Exception as e:
+            self.failures += 1
+            self.next_near = self._after_failure(datetime.now())
+            print(f"Scheduled refresh failed ({self.failures} in a row), retrying at {self.next_near:%H:%M}: {e}")
+            return
+        self.failures = 0
+        self.next_near = self._after_interval(datetime.now(), REFRESH_INTERVAL_MINUTES)
+        print(f"Scheduled refresh {status}, next at {self.next_near:%H:%M}")
+
+    async def _refresh_far(self, now):
+        _, rota_end = default_fetch_window(now.date())
+        far_from = rota_end + timedelta(days=1)
+        far_to = now.date() + timedelta(weeks=REFRESH_FAR_WEEKS + 1)
+        try:
+            await fetcher.fetch(far_from, far_to)
+        except Exception as e:
+            self.next_far = now + timedelta(minutes=REFRESH_INTERVAL_MINUTES)
+            print(f"Far-week refresh failed, retrying at {self.next_far:%H:%M}: {e}")
+            return
+        self.next_far = self._after_interval(datetime.now(), REFRESH_FAR_HOURS * 60)
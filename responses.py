@@ -0,0 +1,198 @@
+import asyncio
+import io
+import discord
+from collections import namedtuple
+from utils import reply, snapshot_note
+from metrics import metrics
+
+# Discord's per-message limits
+MAX_EMBEDS = 10
+MAX_MESSAGE_CHARS = 6000
+MAX_FIELDS = 25
+MAX_FIELD_CHARS = 1024
+MAX_DESCRIPTION_CHARS = 4096
+
+# What a command's query function produces: pages to show, or a plain message,
+# optionally with an attachment given as (filename, bytes)
+Answer = namedtuple("Answer", "pages message ephemeral file", defaults=(None, None, False, None))
+
+class Pages:
+    """Message-sized pages of embeds.
+
+    Pages are planned up front from plain strings (cheap), and only turned
+    into discord.Embed objects when a page is actually shown.
+    """
+
+    def __init__(self, plans, color):
+        self.plans = plans
+        self.color = color
+        self._rendered = {}
+
+    def __len__(self):
+        return len(self.plans)
+
+    def get(self, index):
+        if index not in self._rendered:
+            embeds = []
+            for spec in self.plans[index]:
+                embed = discord.Embed(
+                    title=spec.get("title"),
+                    description=spec.get("description"),
+                    color=spec.get("color", self.color),
+                )
+                for name, value in spec.get("fields", []):
+                    embed.add_field(name=name, value=value, inline=False)
+                embeds.append(embed)
+            self._rendered[index] = embeds
+        return self._rendered[index]
+
+def spec_length(spec):
+    return (len(spec.get("title") or "") + len(spec.get("description") or "")
+            + sum(len(n) + len(v) for n, v in spec.get("fields", [])))
+
+def pack_specs(specs, header=None):
+    """Group embed specs into pages of at most MAX_EMBEDS embeds / MAX_MESSAGE_CHARS chars.
+
+    header (title/description) is repeated on the first embed of every page.
+    """
+    pages = []
+    page, page_chars = [], 0
+    for spec in specs:
+        length = spec_length(spec)
+        if page and (len(page) >= MAX_EMBEDS or page_chars + length > MAX_MESSAGE_CHARS):
+            pages.append(page)
+            page, page_chars = [], 0
+        if not page and header:
+            spec = dict(spec, **{k: v for k, v in header.items() if not spec.get(k)})
+            length = spec_length(spec)
+        page.append(spec)
+        page_chars += length
+    if page:
+        pages.append(page)
+    return pages
+
+def chunk_lines(heading, lines, limit=MAX_FIELD_CHARS):
+    """Split a section into (name, value) fields no longer than limit, marking continuations."""
+    fields = []
+    chunk, chunk_len = [], 0
+    for line in lines:
+        line = line[:limit]
+        if chunk and chunk_len + len(line) + 1 > limit:
+            fields.append(chunk)
+            chunk, chunk_len = [], 0
+        chunk.append(line)
+        chunk_len += len(line) + 1
+    if chunk:
+        fields.append(chunk)
+    return [
+        (heading if i == 0 else f"{heading} (cont'd {i + 1})", "\n".join(chunk))
+        for i, chunk in enumerate(fields)
+    ]
+
+def paginate_fields(sections, title=None, description=None, color=discord.Color.blue()):
+    """Pages for [(heading, [lines])] sections laid out as embed fields."""
+    header = {"title": title, "description": description}
+    # Leave room for the header that pack_specs adds to each page's first embed
+    budget = MAX_MESSAGE_CHARS - spec_length(header)
+    specs = []
+    spec, spec_chars = {"fields": []}, 0
+    for heading, lines in sections:
+        for name, value in chunk_lines(heading, lines):
+            length = len(name) + len(value)
+            if spec["fields"] and (len(spec["fields"]) >= MAX_FIELDS or spec_chars + length > budget):
+                specs.append(spec)
+                spec, spec_chars = {"fields": []}, 0
+            spec["fields"].append((name, value))
+            spec_chars += length
+    if spec["fields"] or not specs:
+        specs.append(spec)
+    return Pages(pack_specs(specs, header), color)
+
+def paginate_blocks(blocks, color=discord.Color.blue()):
+    """Pages for one embed per block, where a block is {"title", "description", "color"}.
+
+    A description too long for one embed continues in further embeds (and
+    so pages), split between lines.
+    """
+    specs = []
+    for b in blocks:
+        lines = (b.get("description") or "").split("\n")
+        for title, description in chunk_lines(b.get("title") or "", lines, MAX_DESCRIPTION_CHARS):
+            specs.append(dict(b, title=title or None, description=description))
+    return Pages(pack_specs(specs), color)
+
+
+class EmbedPager(discord.ui.View):
+    """Previous/next buttons that render the requested page on demand."""
+
+    def __init__(self, pages, owner_id, content=None, timeout=600):
+        super().__init__(timeout=timeout)
+        self.pages = pages
+        self.owner_id = owner_id
+        self.content = content
+        self.index = 0
+        self._sync_buttons()
+
+    def page_content(self):
+        counter = f"Page {self.index + 1}/{len(self.pages)}"
+        return f"{self.content}\n{counter}" if self.content else counter
+
+    def _sync_buttons(self):
+        self.previous.disabled = self.index == 0
+        self.next.disabled = self.index >= len(self.pages) - 1
+
+    async def interaction_check(self, interaction):
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message("Only the person who ran the command can turn pages.", ephemeral=True)
+            return False
+        return True
+
+    async def _show(self, interaction):
+        self._sync_buttons()
+        await interaction.response.edit_message(content=self.page_content(), embeds=self.pages.get(self.index), view=self)
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction, button):
+        self.index = max(0, self.index - 1)
+        await self._show(interaction)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction, button):
+        self.index = min(len(self.pages) - 1, self.index + 1)
+        await self._show(interaction)
+
+
+async def defer(interaction, ephemeral=False):
+    """Acknowledge now (Discord allows 3s) when building the answer may take longer."""
+    if not interaction.response.is_done():
+        metrics.observe_ack(interaction)
+        await interaction.response.defer(thinking=True, ephemeral=ephemeral)
+        # See reply(): an ephemeral answer can't replace a public thinking message
+        interaction.extras["public_thinking"] = not ephemeral
+
+async def send_pages(interaction, pages, content=None, ephemeral=False):
+    """Send the first page, with a pager attached if there is more than one."""
+    if len(pages) == 1:
+        return await reply(interaction, content, embeds=pages.get(0), ephemeral=ephemeral)
+    view = EmbedPager(pages, interaction.user.id, content)
+    return await reply(interaction, view.page_content(), embeds=pages.get(0), view=view, ephemeral=ephemeral)
+
+# If a query hasn't produced its answer by now, acknowledge the interaction
+# first so Discord's 3 second deadline can't expire.
+DEFER_AFTER_SECONDS = 1.5
+
+async def send_answer(interaction, query):
+    """Await a query coroutine returning an Answer and send it, deferring if it runs long."""
+    task = asyncio.ensure_future(query)
+    done, _ = await asyncio.wait({task}, timeout=DEFER_AFTER_SECONDS)
+    if not done:
+        metrics.inc("deferred_answers_total", command=getattr(getattr(interaction, "command", None), "name", "unknown"))
+        await defer(interaction)
+    answer = await task
+    if answer.file:
+        filename, data = answer.file
+        # A discord.File can only be sent once, so it's made here rather than cached
+        return await reply(interaction, answer.message, file=discord.File(io.BytesIO(data), filename=filename), ephemeral=answer.ephemeral)
+    if answer.pages is None:
+        return await reply(interaction, answer.message, ephemeral=answer.ephemeral)
+    return await send_pages(interaction, answer.pages, snapshot_note(), ephemeral=answer.ephemeral)
@@ -0,0 +1,84 @@
+import hashlib
+from collections import namedtuple
+
+def shift_key(s):
+    return (s["name"], s["date"], s["start"], s["end"], s["role"])
+
+def day_hash(shifts):
+    """Content hash of one day's shifts, independent of their order."""
+    digest = hashlib.blake2b(digest_size=16)
+    for key in sorted(repr(shift_key(s)) for s in shifts):
+        digest.update(key.encode())
+        digest.update(b"\0")
+    return digest.digest()
+
+
+class RotaDiff(namedtuple("RotaDiff", "added removed changed", defaults=((), (), ()))):
+    """Shifts added and removed, and (old, new) pairs for shifts that moved or changed role.
+
+    A shift counts as changed rather than removed + added when the same
+    person still has a shift on that day.
+    """
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __add__(self, other):
+        return RotaDiff(
+            list(self.added) + list(other.added),
+            list(self.removed) + list(other.removed),
+            list(self.changed) + list(other.changed),
+        )
+
+    def for_name(self, name):
+        """The part of the diff concerning one person (case-insensitive)."""
+        name = name.lower()
+        return RotaDiff(
+            [s for s in self.added if s["name"].lower() == name],
+            [s for s in self.removed if s["name"].lower() == name],
+            [(old, new) for old, new in self.changed if new["name"].lower() == name],
+        )
+
+    def summary(self):
+        return f"{len(self.added)} added, {len(self.removed)} removed, {len(self.changed)} changed"
+
+
+def diff_day(old, new):
+    """RotaDiff between two versions of one day's shifts, in linear time."""
+    new_keys = {}
+    for s in new:
+        new_keys.setdefault(shift_key(s), []).append(s)
+    gone = []
+    for s in old:
+        same = new_keys.get(shift_key(s))
+        if same:
+            same.pop()
+        else:
+            gone.append(s)
+    arrived = [s for shifts in new_keys.values() for s in shifts]
+
+    # Pair up what's left per person, earliest start first
+    by_name = {}
+    for s in gone:
+        by_name.setdefault(s["name"], ([], []))[0].append(s)
+    for s in arrived:
+        by_name.setdefault(s["name"], ([], []))[1].append(s)
+    from utils import start_minutes  # utils imports this module
+    added, removed, changed = [], [], []
+    for before, after in by_name.values():
+        before.sort(key=start_minutes)
+        after.sort(key=start_minutes)
+        changed.extend(zip(before, after))
+        removed.extend(before[len(after):])
+        added.extend(after[len(before):])
+    return RotaDiff(added, removed, changed)
+
+def diff_days(old_by_date, new_by_date, days):
+    """RotaDiff over the given days, skipping any whose content hash is unchanged."""
+    diff = RotaDiff()
+    for day in sorted(days):
+        old = old_by_date.get(day, [])
+        new = new_by_date.get(day, [])
+        if day_hash(old) != day_hash(new):
+            diff += diff_day(old, new)
+    return diff
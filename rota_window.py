@@ -0,0 +1,9 @@
+from datetime import date, timedelta
+
+# Shared by the bot and the scrape worker, so it mustn't import discord or playwright
+
+def default_fetch_window(today=None):
+    """Yesterday through next Thursday, the span the rota is published for."""
+    today = today or date.today()
+    days_until_next_thursday = (3 - today.weekday() + 7) % 7 or 7
+    return today - timedelta(days=1), today + timedelta(days=days_until_next_thursday)
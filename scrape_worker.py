@@ -0,0 +1,227 @@
+import asyncio
+import json
+import os
+import signal
+import sys
+from datetime import date
+from metrics import metrics
+
+# The scraper (and so Playwright/Chromium) only ever runs in a child process
+# started from this file; the bot talks to it over JSON lines on its stdin/stdout.
+WORKER_SCRIPT = os.path.abspath(__file__)
+# A single scrape taking longer than this gets the worker killed
+SCRAPE_TIMEOUT_SECONDS = int(os.getenv("SCRAPE_TIMEOUT_SECONDS", "600"))
+# Resident memory ceiling for the worker plus its Chromium processes
+SCRAPE_WORKER_MAX_MB = int(os.getenv("SCRAPE_WORKER_MAX_MB", "1536"))
+MEMORY_CHECK_SECONDS = 2
+# Each day's shifts arrive as one line
+MAX_LINE_BYTES = 64 * 1024 * 1024
+
+
+class ScrapeWorkerError(RuntimeError):
+    pass
+
+
+def process_tree_rss_mb(root_pid):
+    """Resident memory of root_pid and all its descendants, from /proc (None if unavailable)."""
+    try:
+        pids = [p for p in os.listdir("/proc") if p.isdigit()]
+    except OSError:
+        return None
+    children = {}
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # The command name can contain spaces, so split after its closing paren
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(pid))
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total, stack = 0, [root_pid]
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, ValueError, IndexError):
+            continue
+    return total / (1024 * 1024)
+
+
+class ScrapeWorker:
+    """Runs stream_user_shifts in a persistent child process.
+
+    One job runs at a time. The worker is started on first use and restarted
+    on the next job after it exits, exceeds SCRAPE_TIMEOUT_SECONDS or grows
+    past SCRAPE_WORKER_MAX_MB; it gets its own process group so Chromium is
+    killed along with it. Metrics recorded in the worker are replayed here.
+    """
+
+    def __init__(self, timeout=SCRAPE_TIMEOUT_SECONDS, max_mb=SCRAPE_WORKER_MAX_MB):
+        self.timeout = timeout
+        self.max_mb = max_mb
+        self.process = None
+        self._next_job = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.returncode is None
+
+    async def _start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, "-u", WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            start_new_session=True,
+            limit=MAX_LINE_BYTES,
+        )
+        metrics.inc("scrape_worker_starts_total")
+        print(f"Started scrape worker (pid {self.process.pid})")
+
+    async def kill(self, reason):
+        if not self.alive:
+            return
+        print(f"Killing scrape worker (pid {self.process.pid}): {reason}")
+        metrics.inc("scrape_worker_kills_total", reason=reason.split(" ")[0])
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        await self.process.wait()
+
+    async def stream(self, target_name=None, from_date=None, to_date=None):
+        """Same contract as quinyx_scraper.stream_user_shifts: yields each day's shifts as it completes.
+
+        The timeout covers the whole job, however long the consumer takes.
+        Use inside contextlib.aclosing(): a stream closed before the job
+        finishes kills the worker, so the next job never queues behind a
+        scrape nobody is reading.
+        """
+        async with self._lock:
+            if not self.alive:
+                await self._start()
+            self._next_job += 1
+            job = {
+                "id": self._next_job,
+                "target": target_name,
+                "from": from_date.isoformat() if from_date else None,
+                "to": to_date.isoformat() if to_date else None,
+            }
+            self.process.stdin.write((json.dumps(job) + "\n").encode())
+            await self.process.stdin.drain()
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.timeout
+            watchdog = asyncio.ensure_future(self._watch_memory())
+            finished = False
+            try:
+                while True:
+                    message = asyncio.ensure_future(self._read_message(job["id"]))
+                    try:
+                        done, _ = await asyncio.wait(
+                            {message, watchdog}, timeout=max(0, deadline - loop.time()),
+                            return_when=asyncio.FIRST_COMPLETED,
+                        )
+                    except BaseException:
+                        message.cancel()
+                        raise
+                    if message in done:
+                        try:
+                            message = message.result()
+                        except ScrapeWorkerError:
+                            finished = True  # the job failed, or the worker is gone
+                            raise
+                        if message["type"] == "day":
+                            yield message["shifts"]
+                            continue
+                        finished = True
+                        return
+                    message.cancel()
+                    if watchdog in done:
+                        await self.kill(f"memory above {self.max_mb}MB")
+                        raise ScrapeWorkerError(f"Scrape worker went over {self.max_mb}MB and was restarted")
+                    await self.kill(f"timeout after {self.timeout}s")
+                    raise ScrapeWorkerError(f"Scrape timed out after {self.timeout}s; the worker was restarted")
+            finally:
+                watchdog.cancel()
+                if not finished:
+                    await self.kill("abandoned stream")
+
+    async def _read_message(self, job_id):
+        """Next "day" or "done" message for job_id; replays metrics, raises on errors."""
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                code = await self.process.wait()
+                raise ScrapeWorkerError(f"Scrape worker exited unexpectedly (code {code})")
+            message = json.loads(line)
+            if message.get("id") != job_id:
+                continue  # left over from a stream that was abandoned
+            if message["type"] == "metrics":
+                metrics.replay(message["entries"])
+            elif message["type"] == "error":
+                raise ScrapeWorkerError(message["error"])
+            else:
+                return message
+
+    async def _watch_memory(self):
+        """Returns once the worker tree is over the ceiling; runs until cancelled otherwise."""
+        while True:
+            await asyncio.sleep(MEMORY_CHECK_SECONDS)
+            rss = await asyncio.to_thread(process_tree_rss_mb, self.process.pid)
+            if rss is None:
+                return await asyncio.Event().wait()
+            metrics.observe("scrape_worker_rss_mb", rss)
+            if rss > self.max_mb:
+                return rss
+
+
+scrape_worker = ScrapeWorker()
+
+
+# --- Worker side (runs in the child process) ---
+
+async def serve(protocol):
+    from quinyx_scraper import stream_user_shifts, session
+
+    def send(message):
+        protocol.write(json.dumps(message) + "\n")
+        protocol.flush()
+
+    metrics.journal = []
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            if not line:
+                break  # the bot went away
+            job = json.loads(line)
+            try:
+                days = stream_user_shifts(
+                    job["target"],
+                    date.fromisoformat(job["from"]) if job["from"] else None,
+                    date.fromisoformat(job["to"]) if job["to"] else None,
+                )
+                async for day in days:
+                    send({"id": job["id"], "type": "day", "shifts": day})
+                reply = {"id": job["id"], "type": "done"}
+            except Exception as e:
+                reply = {"id": job["id"], "type": "error", "error": f"{type(e).__name__}: {e}"}
+            send({"id": job["id"], "type": "metrics", "entries": metrics.journal})
+            metrics.journal = []
+            send(reply)
+    finally:
+        await session.close()
+
+def main():
+    # Keep the real stdout for the protocol and send everything the scraper
+    # prints to stderr, which the bot's console still shows.
+    protocol = os.fdopen(os.dup(1), "w")
+    os.dup2(2, 1)
+    asyncio.run(serve(protocol))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import re
+from bisect import bisect_left
+
+FUZZY_THRESHOLD = 0.45
+
+def normalize(text):
+    """Lower-case and collapse punctuation to spaces, so "Corbyn-smith" matches "corbyn smith"."""
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", text.lower()).split())
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class SearchIndex:
+    """Prefix, substring and typo-tolerant lookups over a fixed set of strings.
+
+    Built once per cache version. Prefix matches (on the whole value or the
+    start of any word) come from a sorted key list with bisect; substring
+    and fuzzy matches from a trigram index, so a keystroke only touches the
+    values that share grams with what was typed.
+    """
+
+    def __init__(self, values):
+        self.values = sorted(set(values))
+        self.norms = [normalize(v) for v in self.values]
+        prefix_keys = []
+        postings = {}
+        self.gram_counts = []
+        for i, norm in enumerate(self.norms):
+            words = norm.split()
+            for w in range(len(words)):
+                prefix_keys.append((" ".join(words[w:]), w, i))
+            grams = trigrams(norm)
+            self.gram_counts.append(len(grams))
+            for g in grams:
+                postings.setdefault(g, []).append(i)
+        prefix_keys.sort()
+        self.prefix_keys = prefix_keys
+        self._prefix_strings = [k for k, _, _ in prefix_keys]
+        self.postings = postings
+
+    def _prefix(self, query):
+        """[(word_position, index)] for values with a word starting with query."""
+        start = bisect_left(self._prefix_strings, query)
+        hits = []
+        for key, word_pos, i in self.prefix_keys[start:]:
+            if not key.startswith(query):
+                break
+            hits.append((word_pos, i))
+        return hits
+
+    def _gram_scores(self, query):
+        counts = {}
+        for g in trigrams(query):
+            for i in self.postings.get(g, ()):
+                counts[i] = counts.get(i, 0) + 1
+        return counts
+
+    def search(self, query, limit=25, exclude=()):
+        """Best matches for an autocomplete query: prefix, then substring, then fuzzy."""
+        exclude = {normalize(e) for e in exclude}
+        query = normalize(query)
+        if not query:
+            return [v for v, n in zip(self.values, self.norms) if n not in exclude][:limit]
+        ranked = []
+        seen = set()
+
+        def add(i):
+            if i not in seen and self.norms[i] not in exclude:
+                seen.add(i)
+                ranked.append(i)
+
+        for _, i in sorted(self._prefix(query)):
+            add(i)
+        if len(ranked) < limit and len(query) >= 3:
+            scores = self._gram_scores(query)
+            query_grams = len(trigrams(query))
+            # Substring matches share every gram of the query's interior
+            for i in sorted(scores, key=lambda i: self.values[i]):
+                if query in self.norms[i]:
+                    add(i)
+            fuzzy = []
+            for i, common in scores.items():
+                score = 2 * common / (query_grams + self.gram_counts[i])
+                if score >= FUZZY_THRESHOLD:
+                    fuzzy.append((-score, self.values[i], i))
+            for _, _, i in sorted(fuzzy):
+                add(i)
+        return [self.values[i] for i in ranked[:limit]]
+
+    def resolve(self, term):
+        """Values a filter term refers to: exact match, else all substring matches, else the closest fuzzy match."""
+        query = normalize(term)
+        if not query:
+            return []
+        exact = [self.values[i] for _, i in self._prefix(query) if self.norms[i] == query]
+        if exact:
+            return exact
+        if len(query) < 3:
+            return sorted({self.values[i] for _, i in self._prefix(query)} |
+                          {v for v, n in zip(self.values, self.norms) if query in n})
+        substring = sorted({self.values[i] for i in self._gram_scores(query) if query in self.norms[i]})
+        if substring:
+            return substring
+        return self.search(term, limit=1)
+
+    def best(self, term):
+        matches = self.resolve(term)
+        return matches[0] if len(matches) == 1 else None
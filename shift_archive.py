@@ -0,0 +1,234 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+
+# Optional SQLite archive (e.g. SHIFT_DB=shifts.db). Every fetch is also
+# written here, so past weeks stay queryable after they drop out of the JSON
+# cache, and /iam bindings live in the same file. Unset to keep JSON only.
+SHIFT_DB = os.getenv("SHIFT_DB")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shifts (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    name TEXT NOT NULL,
+    start INTEGER,
+    end INTEGER,
+    overnight INTEGER NOT NULL DEFAULT 0,
+    role TEXT NOT NULL,
+    fetched_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS shifts_date ON shifts (date, start);
+CREATE INDEX IF NOT EXISTS shifts_name ON shifts (name COLLATE NOCASE, date);
+CREATE INDEX IF NOT EXISTS shifts_role ON shifts (role COLLATE NOCASE, date);
+CREATE TABLE IF NOT EXISTS shift_roles (
+    shift_id INTEGER NOT NULL REFERENCES shifts (id) ON DELETE CASCADE,
+    role TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS shift_roles_role ON shift_roles (role COLLATE NOCASE, shift_id);
+CREATE INDEX IF NOT EXISTS shift_roles_shift ON shift_roles (shift_id);
+CREATE TABLE IF NOT EXISTS fetch_log (
+    id INTEGER PRIMARY KEY,
+    fetched_at TEXT NOT NULL,
+    from_date TEXT NOT NULL,
+    to_date TEXT NOT NULL,
+    shifts INTEGER NOT NULL,
+    source TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS daily_hours (
+    date TEXT NOT NULL,
+    name TEXT NOT NULL,
+    role TEXT NOT NULL,
+    minutes INTEGER NOT NULL,
+    PRIMARY KEY (date, name, role)
+);
+CREATE TABLE IF NOT EXISTS weekly_hours (
+    week TEXT NOT NULL,
+    name TEXT NOT NULL,
+    role TEXT NOT NULL,
+    minutes INTEGER NOT NULL,
+    PRIMARY KEY (week, name, role)
+);
+CREATE TABLE IF NOT EXISTS users (
+    discord_id TEXT PRIMARY KEY,
+    full_name TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS subscribers (
+    discord_id TEXT PRIMARY KEY,
+    subscribed_at TEXT NOT NULL
+);
+"""
+
+# Monday of the week a date falls in
+WEEK_OF = "date({0}, '-' || ((CAST(strftime('%w', {0}) AS INTEGER) + 6) % 7) || ' days')"
+
+REBUILD_DAILY_HOURS = """
+INSERT INTO daily_hours (date, name, role, minutes)
+SELECT date, name, role, SUM(end - start + CASE WHEN overnight THEN 1440 ELSE 0 END)
+FROM shifts
+WHERE date BETWEEN ? AND ? AND start IS NOT NULL AND end IS NOT NULL
+GROUP BY date, name, role
+"""
+
+REBUILD_WEEKLY_HOURS = f"""
+INSERT INTO weekly_hours (week, name, role, minutes)
+SELECT {WEEK_OF.format('date')} AS week, name, role, SUM(minutes)
+FROM daily_hours
+WHERE date BETWEEN ? AND ?
+GROUP BY week, name, role
+"""
+
+SELECT_RANGE = """
+SELECT s.date, s.name, s.start, s.end, s.overnight, s.role,
+       (SELECT json_group_array(r.role) FROM shift_roles r WHERE r.shift_id = s.id)
+FROM shifts s
+WHERE s.date BETWEEN ? AND ?
+ORDER BY s.date, s.start IS NULL, s.start, s.name
+"""
+
+class ShiftArchive:
+    """Shifts, fetch history, /iam users and subscribers in one SQLite file (WAL mode).
+
+    Each thread gets its own connection, so range reads from query builds
+    (already in worker threads) never block each other or the writer. A
+    fetch replaces its date window in a single transaction. Methods are
+    blocking; the async ones hand off to a thread.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Bumped on every write so cached views of the archive know to reload
+        self.version = 0
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            # Archives created before the hours tables existed get them backfilled
+            first, last = self.date_range()
+            if first and conn.execute("SELECT 1 FROM daily_hours LIMIT 1").fetchone() is None:
+                self._rebuild_hours(conn, first, last)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- Shifts ---
+
+    def replace_window(self, shifts, from_date, to_date, fetched_at=None, source="fetch"):
+        """Make [from_date, to_date] hold exactly these (normalized) shifts, and log the fetch."""
+        fetched_at = (fetched_at or datetime.now()).isoformat(timespec="seconds")
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM shifts WHERE date BETWEEN ? AND ?", (from_date.isoformat(), to_date.isoformat()))
+            next_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM shifts").fetchone()[0]
+            rows, role_rows = [], []
+            for shift_id, s in enumerate(shifts, next_id):
+                rows.append((shift_id, s["date"].isoformat(), s["name"], s["start"], s["end"], int(s["overnight"]), s["role"], fetched_at))
+                role_rows.extend((shift_id, r) for r in s["roles"])
+            conn.executemany("INSERT INTO shifts VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.executemany("INSERT INTO shift_roles VALUES (?, ?)", role_rows)
+            self._rebuild_hours(conn, from_date, to_date)
+            conn.execute(
+                "INSERT INTO fetch_log (fetched_at, from_date, to_date, shifts, source) VALUES (?, ?, ?, ?, ?)",
+                (fetched_at, from_date.isoformat(), to_date.isoformat(), len(rows), source),
+            )
+        self.version += 1
+
+    def _rebuild_hours(self, conn, from_date, to_date):
+        """Recompute daily totals for the window and the weekly rollups of the weeks it touches."""
+        week_from = from_date - timedelta(days=from_date.weekday())
+        week_to = to_date + timedelta(days=6 - to_date.weekday())
+        conn.execute("DELETE FROM daily_hours WHERE date BETWEEN ? AND ?", (from_date.isoformat(), to_date.isoformat()))
+        conn.execute(REBUILD_DAILY_HOURS, (from_date.isoformat(), to_date.isoformat()))
+        conn.execute("DELETE FROM weekly_hours WHERE week BETWEEN ? AND ?", (week_from.isoformat(), week_to.isoformat()))
+        conn.execute(REBUILD_WEEKLY_HOURS, (week_from.isoformat(), week_to.isoformat()))
+
+    def daily_hours(self, from_date, to_date):
+        """{date: {name: {role: minutes}}} for from_date..to_date."""
+        return self._hours("SELECT date, name, role, minutes FROM daily_hours WHERE date BETWEEN ? AND ?", from_date, to_date)
+
+    def weekly_hours(self, from_week, to_week):
+        """{week_start: {name: {role: minutes}}} for the weeks starting from_week..to_week."""
+        return self._hours("SELECT week, name, role, minutes FROM weekly_hours WHERE week BETWEEN ? AND ?", from_week, to_week)
+
+    def _hours(self, query, from_date, to_date):
+        totals = {}
+        for day, name, role, minutes in self._connection().execute(query, (from_date.isoformat(), to_date.isoformat())):
+            totals.setdefault(date.fromisoformat(day), {}).setdefault(name, {})[role] = minutes
+        return totals
+
+    async def record_window(self, shifts, from_date, to_date, fetched_at=None, source="fetch"):
+        await asyncio.to_thread(self.replace_window, shifts, from_date, to_date, fetched_at, source)
+
+    def shifts_between(self, from_date, to_date):
+        """Normalized shift dicts (as in the JSON cache) dated from_date..to_date inclusive."""
+        cursor = self._connection().execute(SELECT_RANGE, (from_date.isoformat(), to_date.isoformat()))
+        return [
+            {
+                "name": name,
+                "date": date.fromisoformat(day),
+                "start": start,
+                "end": end,
+                "overnight": bool(overnight),
+                "role": role,
+                "roles": json.loads(roles),
+            }
+            for day, name, start, end, overnight, role, roles in cursor
+        ]
+
+    async def load_range(self, from_date, to_date):
+        return await asyncio.to_thread(self.shifts_between, from_date, to_date)
+
+    def date_range(self):
+        """(first, last) archived date, or (None, None) when empty."""
+        first, last = self._connection().execute("SELECT MIN(date), MAX(date) FROM shifts").fetchone()
+        return (date.fromisoformat(first) if first else None, date.fromisoformat(last) if last else None)
+
+    def fetch_log(self, limit=20):
+        return self._connection().execute(
+            "SELECT fetched_at, from_date, to_date, shifts, source FROM fetch_log ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+    # --- Users ---
+
+    def users(self):
+        """{discord_id: full_name}, the same shape as users.json."""
+        return dict(self._connection().execute("SELECT discord_id, full_name FROM users"))
+
+    def set_users(self, users):
+        """Insert or update bindings from a {discord_id: full_name} dict in one transaction."""
+        now = datetime.now().isoformat(timespec="seconds")
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO users VALUES (?, ?, ?) "
+                "ON CONFLICT (discord_id) DO UPDATE SET full_name = excluded.full_name, updated_at = excluded.updated_at",
+                [(str(k), v, now) for k, v in users.items()],
+            )
+
+    def subscribers(self):
+        """Discord ids (as strings) subscribed to rota change DMs."""
+        return {row[0] for row in self._connection().execute("SELECT discord_id FROM subscribers")}
+
+    def set_subscribed(self, discord_id, subscribed):
+        conn = self._connection()
+        with conn:
+            if subscribed:
+                conn.execute(
+                    "INSERT OR IGNORE INTO subscribers VALUES (?, ?)",
+                    (str(discord_id), datetime.now().isoformat(timespec="seconds")),
+                )
+            else:
+                conn.execute("DELETE FROM subscribers WHERE discord_id = ?", (str(discord_id),))
+
+
+archive = ShiftArchive(SHIFT_DB) if SHIFT_DB else None
@@ -0,0 +1,55 @@
+from bisect import bisect_left
+from datetime import timedelta
+from utils import shift_bounds
+
+# Minimum rest between the end of one shift and the start of the next
+MIN_REST = timedelta(hours=11.5)
+
+class SwapEngine:
+    """Who-can-cover lookups over each person's shifts as sorted intervals.
+
+    Intervals are absolute datetimes (overnight shifts end the next day), so
+    the rest rule works across midnight and month ends. A lookup is one
+    bisect per person rather than a scan of the whole rota.
+    """
+
+    def __init__(self, shifts):
+        intervals = {}
+        dates = {}
+        for s in shifts:
+            dates.setdefault(s["name"], set()).add(s["date"])
+            bounds = shift_bounds(s)
+            if bounds:
+                intervals.setdefault(s["name"], []).append(bounds)
+        for items in intervals.values():
+            items.sort()
+        self.intervals = intervals
+        self.starts = {name: [start for start, _ in items] for name, items in intervals.items()}
+        self.dates = dates
+        self.names = sorted(dates)
+
+    def can_cover(self, name, shift, start, end):
+        # No double shifts: anything else that calendar day rules them out
+        if shift["date"] in self.dates.get(name, ()):
+            return False
+        items = self.intervals.get(name)
+        if not items:
+            return True
+        i = bisect_left(self.starts[name], start)
+        if i > 0 and start - items[i - 1][1] < MIN_REST:
+            return False
+        if i < len(items) and items[i][0] - end < MIN_REST:
+            return False
+        return True
+
+    def candidates(self, shift):
+        """Sorted names of everyone (bar the shift's owner) who could take the shift."""
+        bounds = shift_bounds(shift)
+        if not bounds:
+            return None
+        start, end = bounds
+        return [n for n in self.names if n != shift["name"] and self.can_cover(n, shift, start, end)]
+
+    def matrix(self, shifts):
+        """[(shift, candidates)] for every shift given, e.g. a whole day or week."""
+        return [(s, self.candidates(s)) for s in shifts]
@@ -0,0 +1,129 @@
+import asyncio
+import atexit
+import json
+import os
+import threading
+from shift_archive import archive
+from utils import write_atomic
+
+USERS_FILE = "users.json"
+SUBSCRIBERS_FILE = "subscribers.json"
+# Bindings changed within this many seconds of each other are saved together
+USERS_SAVE_DELAY_SECONDS = float(os.getenv("USERS_SAVE_DELAY_SECONDS", "2"))
+
+def read_json(path, default):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+class UserRegistry:
+    """/iam bindings and change-DM subscribers, held in memory.
+
+    Loaded once on first use; lookups never touch disk. Changes are saved
+    in the background USERS_SAVE_DELAY_SECONDS after the last one, as an
+    atomic rewrite of users.json/subscribers.json, or as an upsert of just
+    the changed rows when the SQLite archive is enabled. Anything still
+    pending is flushed at exit.
+    """
+
+    def __init__(self, users_path=USERS_FILE, subscribers_path=SUBSCRIBERS_FILE, delay=USERS_SAVE_DELAY_SECONDS):
+        self.users_path = users_path
+        self.subscribers_path = subscribers_path
+        self.delay = delay
+        self._users = None
+        self._subscribers = None
+        self._dirty_users = {}
+        self._dirty_subscribers = {}
+        self._save_task = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._users is not None:
+            return
+        if archive:
+            self._users = archive.users()
+            self._subscribers = archive.subscribers()
+        else:
+            self._users = read_json(self.users_path, {})
+            self._subscribers = set(read_json(self.subscribers_path, []))
+
+    @property
+    def users(self):
+        """{discord_id: full_name}, the same shape as users.json."""
+        self._load()
+        return self._users
+
+    @property
+    def subscribers(self):
+        self._load()
+        return self._subscribers
+
+    def name_for(self, discord_id):
+        return self.users.get(str(discord_id))
+
+    def bind(self, discord_id, full_name):
+        with self._lock:
+            self.users[str(discord_id)] = full_name
+            self._dirty_users[str(discord_id)] = full_name
+        self._schedule_save()
+
+    def set_subscribed(self, discord_id, subscribed):
+        with self._lock:
+            if subscribed:
+                self.subscribers.add(str(discord_id))
+            else:
+                self.subscribers.discard(str(discord_id))
+            self._dirty_subscribers[str(discord_id)] = subscribed
+        self._schedule_save()
+
+    def _schedule_save(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()  # no event loop (scripts): save straight away
+            return
+        if self._save_task is None or self._save_task.done():
+            self._save_task = loop.create_task(self._save_later())
+
+    async def _save_later(self):
+        # Loops so changes made while a save was being written aren't left behind
+        while True:
+            await asyncio.sleep(self.delay)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                print(f"Error saving user bindings, will retry on the next change: {e}")
+                return
+            if not self._dirty_users and not self._dirty_subscribers:
+                return
+
+    def flush(self):
+        """Write out pending changes now (blocking)."""
+        with self._lock:
+            users, self._dirty_users = self._dirty_users, {}
+            subscribers, self._dirty_subscribers = self._dirty_subscribers, {}
+            if not users and not subscribers:
+                return
+            try:
+                if archive:
+                    if users:
+                        archive.set_users(users)
+                    for discord_id, subscribed in subscribers.items():
+                        archive.set_subscribed(discord_id, subscribed)
+                    return
+                if users:
+                    write_atomic(self.users_path, json.dumps(self._users, indent=2).encode())
+                if subscribers:
+                    write_atomic(self.subscribers_path, json.dumps(sorted(self._subscribers), indent=2).encode())
+            except Exception:
+                # Keep the changes pending (newer ones win) for the next attempt
+                self._dirty_users = {**users, **self._dirty_users}
+                self._dirty_subscribers = {**subscribers, **self._dirty_subscribers}
+                raise
+
+
+registry = UserRegistry()
+atexit.register(registry.flush)
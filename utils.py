@@ -1,49 +1,635 @@
 import discord
 import os
 import json
-from datetime import datetime
+import asyncio
+import contextlib
+from datetime import datetime, date, timedelta
 from discord import app_commands
+from search_index import SearchIndex
+from metrics import metrics
+from scrape_worker import scrape_worker
+from shift_archive import archive
+from rota_diff import RotaDiff, shift_key, day_hash, diff_days
+from rota_window import default_fetch_window
+from atomic_file import write_atomic
+from collections import OrderedDict
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 CACHE_FILE = "shifts_cache.json"
+CACHE_SCHEMA_VERSION = 2
 
 def load_cache():
+    return store.all()
+
+def dumps_compact(data):
+    if orjson:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode()
+
+def loads(raw):
+    if orjson:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+async def save_cache(shifts, fetched_at=None):
+    """Write shifts in the versioned, pre-parsed cache format.
+
+    Accepts raw scraper dicts or already-normalized shifts. Encoding and the
+    write run in a worker thread to keep the gateway loop responsive.
+    """
+    shifts = [n for n in (normalize_shift(s) for s in shifts) if n]
+    fetched_at = fetched_at or datetime.now()
+    dates = [s["date"] for s in shifts]
+    payload = {
+        "schema": CACHE_SCHEMA_VERSION,
+        "fetched_at": fetched_at.isoformat(timespec="seconds"),
+        "range": {
+            "from": min(dates).isoformat() if dates else None,
+            "to": max(dates).isoformat() if dates else None,
+        },
+        "shifts": [dict(s, date=s["date"].isoformat()) for s in shifts],
+    }
+    with metrics.timer("cache_write_seconds"):
+        await asyncio.to_thread(lambda: write_atomic(CACHE_FILE, dumps_compact(payload)))
+    store.publish(shifts, fetched_at)
+
+def read_cache_file(path):
+    """Return (fetched_at, shifts) from a cache file, upgrading old formats.
+
+    Schema 2 files are used as-is; the legacy plain list (and the
+    {"shifts": [...], "last_fetch": ...} export) is normalized on the fly,
+    using the file's mtime to work out which year "Mon 09 Jun" belongs to.
+    """
+    with open(path, "rb") as f:
+        data = loads(f.read())
+    if isinstance(data, dict) and data.get("schema") == CACHE_SCHEMA_VERSION:
+        fetched_at = datetime.fromisoformat(data["fetched_at"]) if data.get("fetched_at") else None
+        shifts = []
+        for s in data.get("shifts", []):
+            s["date"] = date.fromisoformat(s["date"])
+            shifts.append(s)
+        return fetched_at, shifts
+    if isinstance(data, dict):
+        fetched_at = datetime.fromisoformat(data["last_fetch"]) if data.get("last_fetch") else None
+        raw = data.get("shifts", [])
+    else:
+        fetched_at = None
+        raw = data
+    reference = fetched_at or datetime.fromtimestamp(os.path.getmtime(path))
+    shifts = [n for n in (normalize_shift(s, reference) for s in raw) if n]
+    return fetched_at or reference, shifts
+
+FETCH_DEBOUNCE_MINUTES = float(os.getenv("FETCH_DEBOUNCE_MINUTES", "10"))
+# Scrapes longer than this are split into consecutive chunks of this many days.
+# Keep it above the 9-day default window so a routine refresh is one scrape.
+FETCH_CHUNK_DAYS = int(os.getenv("FETCH_CHUNK_DAYS", "14"))
+# Past days older than this are dropped from the cache when a fetch merges in
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "14"))
+# While a scrape streams in, completed days are published to the store at
+# most this often (the first day straight away)
+PARTIAL_PUBLISH_SECONDS = float(os.getenv("PARTIAL_PUBLISH_SECONDS", "2"))
+
+def split_window(from_date, to_date, chunk_days=FETCH_CHUNK_DAYS):
+    chunks = []
+    start = from_date
+    while start <= to_date:
+        end = min(start + timedelta(days=chunk_days - 1), to_date)
+        chunks.append((start, end))
+        start = end + timedelta(days=1)
+    return chunks
+
+async def stream_into_cache(days, from_date, to_date, retention_days=RETENTION_DAYS):
+    """Merge a streamed scrape of [from_date, to_date] into the cache as it arrives.
+
+    days is an async iterator of raw per-day shift lists. Completed days that
+    differ from the snapshot are published to the store straight away
+    (marked partial, with the rest of the old snapshot still in place) and
+    the file is written once at the end: days inside the window are replaced
+    by what the scrape found, days outside it kept unless they've fallen
+    past the retention horizon. Returns (shifts scraped, RotaDiff of the
+    window). With nothing scraped, or nothing changed, the file isn't
+    rewritten.
+    """
+    await store.refresh()
+    cutoff = date.today() - timedelta(days=retention_days)
+    snapshot = store.snapshot
+    previous = snapshot.by_date
+    base = [s for s in snapshot.shifts if s["date"] >= cutoff]
+    pruned = len(base) != len(snapshot.shifts)
+    scraped = {}
+    seen = set()
+    dirty = set()
+    last_publish = None
+
+    def merged(replace_window):
+        kept = [
+            s for s in base
+            if s["date"] not in scraped and not (replace_window and from_date <= s["date"] <= to_date)
+        ]
+        return kept + [s for day in scraped.values() for s in day]
+
     try:
-        with open(CACHE_FILE, "r") as f:
-            return json.load(f)
-    except:
-        return []
+        async for raw in days:
+            for n in (normalize_shift(s) for s in raw):
+                if n and from_date <= n["date"] <= to_date and shift_key(n) not in seen:
+                    seen.add(shift_key(n))
+                    scraped.setdefault(n["date"], []).append(n)
+                    dirty.add(n["date"])
+            now = asyncio.get_running_loop().time()
+            if dirty and (last_publish is None or now - last_publish >= PARTIAL_PUBLISH_SECONDS):
+                # Days that came back exactly as cached don't need a new snapshot
+                if any(day_hash(scraped[d]) != day_hash(previous.get(d, [])) for d in dirty):
+                    store.publish(merged(replace_window=False), store.fetched_at, partial=True)
+                    last_publish = now
+                dirty.clear()
+    except BaseException:
+        # The scrape died part-way: go back to the snapshot that's on disk
+        if last_publish is not None:
+            store.publish(base, store.fetched_at)
+        raise
+    if not scraped:
+        if last_publish is not None:
+            store.publish(base, store.fetched_at)
+        return 0, RotaDiff()
+    window = {d for d in previous if from_date <= d <= to_date} | set(scraped)
+    diff = diff_days(previous, scraped, window)
+    if diff or pruned:
+        await save_cache(merged(replace_window=True))
+    else:
+        metrics.inc("cache_writes_skipped_total")
+        if last_publish is not None:
+            store.publish(base)
+        else:
+            store.touch()
+    for kind in ("added", "removed", "changed"):
+        if getattr(diff, kind):
+            metrics.inc("rota_changes_total", len(getattr(diff, kind)), kind=kind)
+    if archive:
+        fresh = [s for day in scraped.values() for s in day]
+        await archive.record_window(fresh, from_date, to_date, store.fetched_at)
+    return len(seen), diff
+
+
+class FetchCoordinator:
+    """Single-flight wrapper around the Quinyx scrape.
+
+    Only one scrape (and so one Chromium) runs at a time: callers asking for
+    a window that is already in flight await the same result, other windows
+    queue behind it, and a request within FETCH_DEBOUNCE_MINUTES of a
+    finished scrape of the same window gets the fresh cache back.
+    fetch() returns (shifts, status) where status is "fetched", "joined"
+    or "fresh". After a scrape that changed the rota, each listener added
+    with on_change() is called (in its own task) with the RotaDiff.
+    """
+
+    def __init__(self, debounce_minutes=FETCH_DEBOUNCE_MINUTES):
+        self.debounce = timedelta(minutes=debounce_minutes)
+        self.last_completed = {}
+        self.last_diff = RotaDiff()
+        self.listeners = []
+        self._tasks = {}
+        self._notifications = set()
+        self._lock = asyncio.Lock()
+
+    def on_change(self, listener):
+        """Register an async callable taking a RotaDiff."""
+        self.listeners.append(listener)
+        return listener
+
+    @property
+    def running(self):
+        return any(not t.done() for t in self._tasks.values())
+
+    async def fetch(self, from_date=None, to_date=None, force=False):
+        if from_date is None or to_date is None:
+            from_date, to_date = default_fetch_window()
+        window = (from_date, to_date)
+        task = self._tasks.get(window)
+        if task and not task.done():
+            return await asyncio.shield(task), "joined"
+        last = self.last_completed.get(window)
+        if not force and last and datetime.now() - last < self.debounce:
+            return store.all(), "fresh"
+        task = self._tasks[window] = asyncio.create_task(self._run(window))
+        return await asyncio.shield(task), "fetched"
+
+    async def _run(self, window):
+        async with self._lock:
+            diff = RotaDiff()
+            try:
+                for chunk_from, chunk_to in split_window(*window):
+                    async with contextlib.aclosing(scrape_worker.stream(from_date=chunk_from, to_date=chunk_to)) as days:
+                        found, chunk_diff = await stream_into_cache(days, chunk_from, chunk_to)
+                    if not found:
+                        # An empty scrape is far more likely a broken page than an empty rota
+                        print(f"Scrape of {chunk_from}..{chunk_to} returned nothing, keeping cached days")
+                    diff += chunk_diff
+            finally:
+                # Chunks that did land still get announced if a later one fails
+                self.last_diff = diff
+                if diff:
+                    print(f"Rota changed: {diff.summary()}")
+                    for listener in self.listeners:
+                        task = asyncio.create_task(listener(diff))
+                        self._notifications.add(task)
+                        task.add_done_callback(self._notification_done)
+            self.last_completed[window] = datetime.now()
+            return store.shifts
+
+    def _notification_done(self, task):
+        self._notifications.discard(task)
+        if not task.cancelled() and task.exception():
+            print("Rota change listener failed:", task.exception())
+
+
+fetcher = FetchCoordinator()
+
+
+async def reply(interaction, content=None, **kwargs):
+    """Send a response, or a followup if the interaction was already deferred.
+
+    After a public "thinking" defer the first followup replaces that message
+    and can't be ephemeral, so for an ephemeral reply the thinking message
+    is deleted first and the reply sent as a message of its own.
+    """
+    if interaction.response.is_done():
+        if interaction.extras.pop("public_thinking", False) and kwargs.get("ephemeral"):
+            await interaction.delete_original_response()
+        return await interaction.followup.send(content, **kwargs)
+    metrics.observe_ack(interaction)
+    return await interaction.response.send_message(content, **kwargs)
+
+async def ensure_snapshot(interaction):
+    """True if there's shift data to answer from.
+
+    Commands always answer from the last good snapshot; only when no cache
+    exists at all does the caller wait on a scrape, and then only until its
+    first days have streamed in.
+    """
+    await store.refresh()
+    if store.all():
+        return True
+    metrics.observe_ack(interaction)
+    await interaction.response.defer(thinking=True)
+    interaction.extras["public_thinking"] = True
+    fetch = asyncio.ensure_future(fetcher.fetch())
+    fetch.add_done_callback(report_fetch_failure)
+    while not store.all() and not fetch.done():
+        await asyncio.wait({fetch}, timeout=0.5)
+    return bool(store.all())
+
+def report_fetch_failure(task):
+    if not task.cancelled() and task.exception():
+        print("Fetch for empty cache failed:", task.exception())
+
+def format_age(delta):
+    minutes = int(delta.total_seconds() // 60)
+    if minutes < 1:
+        return "just now"
+    if minutes < 60:
+        return f"{minutes} min ago"
+    if minutes < 48 * 60:
+        return f"{minutes // 60}h {minutes % 60}m ago"
+    return f"{minutes // (24 * 60)}d ago"
+
+def snapshot_note():
+    """One-line note on how old the served rota is, for message content."""
+    if store.fetched_at:
+        note = f"-# Rota as of {store.fetched_at:%a %d %b %H:%M} ({format_age(datetime.now() - store.fetched_at)})"
+    elif store.partial:
+        note = "-# Rota still loading"
+    else:
+        return None
+    if store.partial:
+        note += ", some days already updated by the fetch in progress"
+    elif fetcher.running:
+        note += ", refreshing in the background"
+    return note
+
+
+def hhmm_to_minutes(value):
+    try:
+        hours, minutes = value.strip().split(":")
+        return int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        return None
+
+def fmt_minutes(minutes):
+    if minutes is None:
+        return "?"
+    return f"{minutes // 60 % 24:02d}:{minutes % 60:02d}"
+
+def normalize_shift(s, reference=None):
+    """Turn a raw scraper/legacy shift into the pre-parsed cache shape.
+
+    The result has a datetime.date "date", "start"/"end" in minutes from
+    midnight (None if unknown), an "overnight" flag and pre-split "roles".
+    Already-normalized shifts are returned unchanged.
+    """
+    if isinstance(s.get("date"), date):
+        return s
+    d = parse_shift_date(s.get("date") or "", reference)
+    if not d:
+        return None
+    start, end = s.get("start"), s.get("end")
+    if not isinstance(start, int):
+        start = hhmm_to_minutes(start)
+    if not isinstance(end, int):
+        end = hhmm_to_minutes(end)
+    role = s.get("role") or ""
+    return {
+        "name": s.get("name") or "Unknown",
+        "date": d,
+        "start": start,
+        "end": end,
+        "overnight": start is not None and end is not None and end < start,
+        "role": role,
+        "roles": split_multi_field(role),
+    }
+
+def shift_bounds(s):
+    """Absolute (start, end) datetimes of a normalized shift, or None."""
+    if s["start"] is None or s["end"] is None:
+        return None
+    midnight = datetime.combine(s["date"], datetime.min.time())
+    start = midnight + timedelta(minutes=s["start"])
+    end = midnight + timedelta(minutes=s["end"] + (24 * 60 if s["overnight"] else 0))
+    return start, end
+
+def start_minutes(s):
+    """Sort key for a shift's start time; shifts without one sort last."""
+    return s["start"] if s["start"] is not None else 24 * 60
+
+
+class Snapshot:
+    """One immutable, fully indexed version of the shifts.
+
+    Everything a query reads lives here, built completely before it is
+    published, so code running in a worker thread can take a snapshot once
+    and query it while the event loop swaps in newer ones.
+    """
+
+    def __init__(self, shifts, version=0):
+        by_date, by_name, by_role = {}, {}, {}
+        names, roles = {}, {}
+        for s in shifts:
+            by_name.setdefault(s["name"].lower(), []).append(s)
+            names.setdefault(s["name"].lower(), s["name"])
+            by_date.setdefault(s["date"], []).append(s)
+            for r in s["roles"]:
+                by_role.setdefault(r.lower(), []).append(s)
+                roles.setdefault(r.lower(), r)
+        for day_shifts in by_date.values():
+            day_shifts.sort(key=lambda s: (s["start"] is None, s["start"] or 0))
+        self.version = version
+        self.shifts = shifts
+        self.by_date = by_date
+        self.by_name = by_name
+        self.by_role = by_role
+        # Display-cased names/roles, sorted once per version for autocomplete
+        self.names = sorted(names.values())
+        self.roles = sorted(roles.values())
+        self.name_index = SearchIndex(self.names)
+        self.role_index = SearchIndex(self.roles)
+        self.dates = sorted(by_date)
+        self.date_labels = [date_to_pretty(d) for d in self.dates]
+        self._derived = {}
+        self._derived_lock = threading.Lock()
+
+    def derived(self, factory):
+        """factory(shifts), built once for this snapshot and kept with it (e.g. SwapEngine)."""
+        with self._derived_lock:
+            if factory not in self._derived:
+                self._derived[factory] = factory(self.shifts)
+            return self._derived[factory]
+
+    def all(self):
+        return self.shifts
+
+    def on_date(self, day):
+        return self.by_date.get(day, [])
+
+    def covers(self, *days):
+        return all(d in self.by_date for d in days)
+
+    def matching_names(self, terms):
+        """Display names the given terms resolve to through the name index."""
+        return sorted({n for t in terms if t for n in self.name_index.resolve(t)})
+
+    def matching_roles(self, terms):
+        return sorted({r for t in terms if t for r in self.role_index.resolve(t)})
+
+    def select(self, names=None, date=None, roles=None):
+        """Shifts matching every given filter, built from the smallest index hit.
+
+        names/roles are lists of substrings (any may match), date is a date.
+        """
+        candidates = []
+        if date is not None:
+            candidates.append(self.by_date.get(date, []))
+        if names:
+            candidates.append([s for n in self.matching_names(names) for s in self.by_name.get(n.lower(), [])])
+        if roles:
+            seen = set()
+            hits = []
+            for r in self.matching_roles(roles):
+                for s in self.by_role.get(r.lower(), []):
+                    if id(s) not in seen:
+                        seen.add(id(s))
+                        hits.append(s)
+            candidates.append(hits)
+        if not candidates:
+            return list(self.shifts)
+        candidates.sort(key=len)
+        result = candidates[0]
+        for other in candidates[1:]:
+            keep = {id(s) for s in other}
+            result = [s for s in result if id(s) in keep]
+        return list(result)
+
 
-def save_cache(shifts):
-    with open(CACHE_FILE, "w") as f:
-        json.dump(shifts, f, indent=2)
+class ShiftStore:
+    """Process-wide view of the shift cache, as a current Snapshot.
 
-async def fetch_and_cache():
-    from quinyx_scraper import fetch_user_shifts
-    shifts = await fetch_user_shifts()
-    save_cache(shifts)
-    return shifts
+    The file is only re-read when its mtime changes (or when a fetch
+    publishes new data), so commands and autocompletes can query it on every
+    keystroke without touching the disk. Callers await refresh() once at the
+    start of a command. New data replaces self.snapshot in one assignment;
+    the snapshot's attributes and query methods are available on the store
+    too, but code that reads more than one of them (anything in a query
+    build) should take store.snapshot once and use that.
+    """
 
-def parse_date(date_str):
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.fetched_at = None
+        self.partial = False
+        self._mtime = None
+        self._lock = asyncio.Lock()
+        self.snapshot = Snapshot([])
+
+    def __getattr__(self, name):
+        # Only reached for names the store itself doesn't have
+        if name == "snapshot":
+            raise AttributeError(name)
+        return getattr(self.snapshot, name)
+
+    def _index(self, shifts):
+        self.snapshot = Snapshot(shifts, self.snapshot.version + 1)
+
+    async def refresh(self):
+        """Reload from disk (in a worker thread) if the file changed since the last load.
+
+        A file that fails to parse is skipped and the previous snapshot kept
+        until the file changes again.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        async with self._lock:
+            if mtime == self._mtime:
+                return
+            try:
+                with metrics.timer("cache_read_seconds"):
+                    fetched_at, shifts = await asyncio.to_thread(read_cache_file, self.path)
+            except Exception as e:
+                metrics.inc("cache_read_errors_total")
+                print(f"Error reading cache, keeping the previous snapshot: {e}")
+                self._mtime = mtime
+                return
+            self._mtime = mtime
+            self.fetched_at = fetched_at
+            self._index(shifts)
+
+    def publish(self, shifts, fetched_at=None, partial=False):
+        """Swap in a new snapshot; partial marks days still streaming in from a fetch."""
+        self.fetched_at = fetched_at if partial else fetched_at or datetime.now()
+        self.partial = partial
+        self._index(shifts)
+        try:
+            self._mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            self._mtime = None
+
+    def touch(self, fetched_at=None):
+        """Mark the current snapshot as confirmed by a fetch that found no changes."""
+        self.fetched_at = fetched_at or datetime.now()
+        self.partial = False
+
+
+store = ShiftStore()
+metrics.gauge("cached_shifts", lambda: len(store.shifts))
+metrics.gauge("cache_age_seconds", lambda: int((datetime.now() - store.fetched_at).total_seconds()) if store.fetched_at else 0)
+
+# Days outside the live snapshot are answered from the archive, through a
+# Snapshot of a few weeks around the requested day (so rest rules still see
+# the neighbouring shifts). A few of these are kept.
+ARCHIVE_VIEWS = 8
+_archive_views = OrderedDict()
+_archive_views_lock = threading.Lock()
+
+def archived(day, live=None):
+    """True if day is outside the live snapshot and the archive can answer for it."""
+    dates = (live or store.snapshot).dates
+    return archive is not None and day is not None and not (dates and dates[0] <= day <= dates[-1])
+
+def source_for(day, live=None):
+    """The Snapshot to answer queries about day from: live (default the current one), or an archive view.
+
+    Blocking (it may read the archive), so call it from the query build thread.
+    """
+    live = live or store.snapshot
+    if not archived(day, live):
+        return live
+    start = day - timedelta(days=day.weekday() + 7)
+    key = (archive.version, start)
+    with _archive_views_lock:
+        view = _archive_views.get(key)
+        if view is not None:
+            _archive_views.move_to_end(key)
+            return view
+    with metrics.timer("archive_read_seconds"):
+        view = Snapshot(archive.shifts_between(start, start + timedelta(days=27)))
+    with _archive_views_lock:
+        _archive_views[key] = view
+        while len(_archive_views) > ARCHIVE_VIEWS:
+            _archive_views.popitem(last=False)
+    return view
+
+def infer_year(day_num, month, weekday=None, reference=None):
+    """Pick the year for a yearless "09 Jun" closest to the reference date.
+
+    When a weekday name is known, years where it doesn't match are skipped,
+    so "Thu 01 Jan" read in late December lands in the new year.
+    """
+    reference = reference or datetime.now()
+    best = None
+    for year in (reference.year - 1, reference.year, reference.year + 1):
+        try:
+            candidate = datetime.strptime(f"{day_num} {month} {year}", "%d %b %Y")
+        except ValueError:
+            continue
+        if weekday and candidate.strftime("%a").lower() != weekday[:3].lower():
+            continue
+        if best is None or abs(candidate - reference) < abs(best - reference):
+            best = candidate
+    return best
+
+def parse_date(date_str, reference=None):
     try:
         if "," in date_str and "/" in date_str:
             day_name, date_part = date_str.split(",")
             date_obj = datetime.strptime(date_part.strip(), "%d/%m/%Y")
             return date_obj, day_name.strip()
+        elif date_str and "-" in date_str:
+            date_obj = datetime.strptime(date_str.strip(), "%Y-%m-%d")
+            return date_obj, date_obj.strftime("%a")
         elif date_str and len(date_str.split()) == 3:
-            day_str, day_num, month = date_str.split()
-            now = datetime.now()
-            date_obj = datetime.strptime(f"{day_num} {month} {now.year}", "%d %b %Y")
-            return date_obj, day_str
+            parts = date_str.split()
+            if parts[0].isdigit():
+                # "09 Jun Mon", as shown by day_autocomplete
+                day_num, month, day_str = parts
+            else:
+                day_str, day_num, month = parts
+            date_obj = infer_year(day_num, month, day_str, reference)
+            if date_obj:
+                return date_obj, day_str
         elif date_str and len(date_str.split()) == 2:
             day_num, month = date_str.split()
-            now = datetime.now()
-            date_obj = datetime.strptime(f"{day_num} {month} {now.year}", "%d %b %Y")
-            return date_obj, date_obj.strftime("%a")
+            date_obj = infer_year(day_num, month, None, reference)
+            if date_obj:
+                return date_obj, date_obj.strftime("%a")
     except Exception:
         pass
     return None, date_str
 
+def parse_shift_date(date_str, reference=None):
+    d, _ = parse_date(date_str, reference)
+    return d.date() if d else None
+
+def parse_day_arg(day, now=None):
+    """Resolve a /rota-style day argument ("today", "tomorrow", "09 Jun Mon") to a date."""
+    now = now or datetime.now()
+    if not day:
+        return None
+    if day.lower() == "today":
+        return now.date()
+    if day.lower() == "tomorrow":
+        return now.date() + timedelta(days=1)
+    parts = day.split()
+    if len(parts) >= 2 and parts[0].isdigit():
+        parts = parts[:3]
+    return parse_shift_date(" ".join(parts), now)
+
 def date_to_pretty(date_obj):
     return date_obj.strftime("%d %b %a")
 
@@ -56,11 +642,11 @@ def get_unique(field):
     data = load_cache()
     return sorted(set([s[field] for s in data if s.get(field)]))
 
+@metrics.timed("autocomplete_seconds", field="name")
 async def name_autocomplete(
     interaction: discord.Interaction, current: str
 ) -> list[app_commands.Choice[str]]:
-    shifts = load_cache()
-    names = sorted({s["name"] for s in shifts if "name" in s and s["name"]})
+    await store.refresh()
     if "," in current:
         prefix = ",".join(current.split(",")[:-1]).strip(", ")
         already = split_multi_field(prefix)
@@ -69,54 +655,38 @@ async def name_autocomplete(
         prefix = ""  # <--- FIX: Always define prefix
         already = []
         last = current.strip()
-    candidates = [n for n in names if not any(n.lower() == a.lower() for a in already)]
-    starts_with = [n for n in candidates if n.lower().startswith(last.lower())]
-    contains = [n for n in candidates if last.lower() in n.lower() and not n.lower().startswith(last.lower())]
-    suggestions = starts_with + contains
+    suggestions = store.name_index.search(last, limit=25, exclude=already)
     return [
         app_commands.Choice(
             name=f"{prefix}, {s}" if prefix else s,
             value=f"{prefix}, {s}" if prefix else s,
         )
-        for s in suggestions[:25]
+        for s in suggestions
     ]
 
 
 
 
 
+@metrics.timed("autocomplete_seconds", field="day")
 async def day_autocomplete(interaction: discord.Interaction, current: str):
-    shifts = load_cache()
-    seen_dates = set()
-    date_options = []
-    for s in shifts:
-        d, day_str = parse_date(s.get("date", ""))
-        if d and d.date() not in seen_dates:
-            seen_dates.add(d.date())
-            pretty = d.strftime("%d %b %a")  # 09 Jun Mon
-            date_options.append((d, pretty))
-    date_options.sort()  # by date ascending
+    await store.refresh()
     return [
         app_commands.Choice(name=pretty, value=pretty)
-        for _, pretty in date_options if current.lower() in pretty.lower()
+        for pretty in store.date_labels if current.lower() in pretty.lower()
     ][:20]
 
 
+@metrics.timed("autocomplete_seconds", field="role")
 async def role_autocomplete(interaction: discord.Interaction, current: str):
     # Return a list of roles from the cache, supporting multi selection (comma separated)
-    shifts = load_cache()
-    roles = set()
-    for s in shifts:
-        if s.get("role"):
-            for r in split_multi_field(s["role"]):
-                roles.add(r)
-    roles = sorted(list(roles))
+    await store.refresh()
     # If user is entering multi, suggest only for the last part they're typing
     if ',' in current or ';' in current:
         entered = split_multi_field(current)
         last = entered[-1] if entered else ""
-        suggestions = [r for r in roles if last.lower() in r.lower()]
+        suggestions = store.role_index.search(last, limit=20, exclude=entered[:-1])
         # Prepend already entered roles so user can see
-        return [app_commands.Choice(name=", ".join(entered[:-1] + [r]), value=", ".join(entered[:-1] + [r])) for r in suggestions[:20]]
+        return [app_commands.Choice(name=", ".join(entered[:-1] + [r]), value=", ".join(entered[:-1] + [r])) for r in suggestions]
     else:
-        return [app_commands.Choice(name=r, value=r) for r in roles if current.lower() in r.lower()][:20]
+        return [app_commands.Choice(name=r, value=r) for r in store.role_index.search(current, limit=20)]